@@ -0,0 +1,90 @@
+"""
+Compare the ChromaDB and NumPy retrieval backends of RAGPipeline.
+
+Measures backend startup (opening the store, model load excluded), per-query
+retrieval latency on pre-computed query embeddings, and how often both
+backends return the same top-k ids.
+
+Run with:  python benchmark_retrieval.py [--queries 200] [--top-k 3]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+from sentence_transformers import SentenceTransformer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHROMA_PATH = os.path.join(BASE_DIR, "chroma_db")
+VECTOR_INDEX_DIR = os.path.join(BASE_DIR, "vector_index")
+MODEL_PATH = "all-MiniLM-L6-v2"
+
+SAMPLE_QUERIES = [
+    "build a topology using 3 routers",
+    "connect two switches to a router",
+    "star topology with one hub and five pcs",
+    "ring of four routers",
+    "add a cloud connected to the core router",
+    "mesh network between three routers",
+    "daisy chain of switches",
+    "server connected to an ethernet switch",
+]
+
+
+def open_chroma():
+    import chromadb
+    return chromadb.PersistentClient(path=CHROMA_PATH).get_collection("network_docs")
+
+
+def open_numpy():
+    from vector_index import NumpyVectorIndex
+    return NumpyVectorIndex(VECTOR_INDEX_DIR)
+
+
+def time_queries(store, embeddings, top_k):
+    """Return (latencies in ms, result ids) for one query per embedding."""
+    latencies, ids = [], []
+    for embedding in embeddings:
+        start = time.perf_counter()
+        result = store.query(query_embeddings=[embedding], n_results=top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append(result["ids"][0])
+    return latencies, ids
+
+
+def summary(latencies):
+    ordered = sorted(latencies)
+    return (f"mean {statistics.mean(ordered):7.3f} ms   p50 {ordered[len(ordered) // 2]:7.3f} ms   "
+            f"p95 {ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ChromaDB against the NumPy vector index.")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries to time per backend")
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    print("Encoding queries...")
+    model = SentenceTransformer(MODEL_PATH)
+    rng = random.Random(0)
+    texts = [f"{rng.choice(SAMPLE_QUERIES)} {rng.randint(1, 9)}" for _ in range(args.queries)]
+    embeddings = model.encode(texts).tolist()
+
+    results = {}
+    for name, opener in (("chroma", open_chroma), ("numpy", open_numpy)):
+        start = time.perf_counter()
+        store = opener()
+        startup = (time.perf_counter() - start) * 1000
+        store.query(query_embeddings=[embeddings[0]], n_results=args.top_k)  # warm-up
+        latencies, ids = time_queries(store, embeddings, args.top_k)
+        results[name] = ids
+        print(f"{name:>6}: startup {startup:8.1f} ms   {summary(latencies)}")
+
+    same = sum(a == b for a, b in zip(results["chroma"], results["numpy"]))
+    print(f"Identical top-{args.top_k} ids: {same}/{len(texts)}")
+
+
+if __name__ == "__main__":
+    main()
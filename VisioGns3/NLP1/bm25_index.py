@@ -0,0 +1,139 @@
+"""
+Precomputed BM25 index over the RAG chunks.
+
+Dense retrieval can miss exact terminology ("full mesh", "daisy chain",
+"3 routers"), so the chunks are also indexed lexically. The BM25 weight of
+every (term, chunk) pair is computed once at build time and stored as a
+term x chunk sparse matrix, i.e. an inverted index whose rows are posting
+lists. Scoring a batch of queries is then a single sparse product
+(queries x terms) @ (terms x chunks).
+
+Built by local_embeddings_chromadb.py next to the embeddings; loaded by
+RAGPipeline for hybrid search. Builds are published like the vector index's
+(vector_index.publish_index_version), so the matrix and the records a reader
+loads always come from the same build.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+from vector_index import current_index_dir, publish_index_version
+
+MATRIX_FILE = "postings.npz"
+RECORDS_FILE = "records.json"
+
+K1 = 1.5
+B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from in into is it of on or that the this to with".split()
+)
+
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens; underscores and punctuation split words (full_mesh -> full, mesh)."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Loaded BM25 inverted index; search_many() scores several queries with one sparse product."""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        version_dir = current_index_dir(index_dir)
+        if version_dir is None:
+            raise FileNotFoundError(f"No BM25 index published in {index_dir}")
+        with open(os.path.join(version_dir, RECORDS_FILE), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        self.ids = records["ids"]
+        self.documents = records["documents"]
+        self.metadatas = records["metadatas"]
+        self.vocabulary = records["vocabulary"]
+        self.postings = sparse.load_npz(os.path.join(version_dir, MATRIX_FILE)).tocsr()
+
+    def count(self):
+        return len(self.ids)
+
+    def query_matrix(self, queries):
+        """Sparse (queries x terms) matrix of query term counts; unknown terms are dropped."""
+        rows, cols, counts = [], [], []
+        for row, query in enumerate(queries):
+            terms = Counter(self.vocabulary[t] for t in tokenize(query) if t in self.vocabulary)
+            for col, count in terms.items():
+                rows.append(row)
+                cols.append(col)
+                counts.append(count)
+        return sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float32), (rows, cols)),
+            shape=(len(queries), len(self.vocabulary)),
+        )
+
+    def scores(self, queries):
+        """Dense (queries x chunks) BM25 scores."""
+        if not self.ids:
+            return np.zeros((len(queries), 0), dtype=np.float32)
+        return (self.query_matrix(queries) @ self.postings).toarray()
+
+    def search_many(self, queries, n_results=10):
+        """
+        Return, per query, the (chunk index, score) pairs of the n_results best
+        chunks, best first. Chunks sharing no term with the query are left out.
+        """
+        results = []
+        for row in self.scores(queries):
+            matched = np.flatnonzero(row)
+            if len(matched) > n_results:
+                matched = matched[np.argpartition(-row[matched], n_results - 1)[:n_results]]
+            matched = matched[np.argsort(-row[matched], kind="stable")]
+            results.append([(int(i), float(row[i])) for i in matched])
+        return results
+
+
+def build_index(index_dir, chunks, k1=K1, b=B):
+    """
+    Compute BM25 weights for a chunk list and publish them as a new version of index_dir.
+
+    :return: vocabulary size.
+    """
+    vocabulary = {}
+    rows, cols, tfs = [], [], []
+    lengths = np.zeros(len(chunks), dtype=np.float32)
+    for doc, chunk in enumerate(chunks):
+        tokens = tokenize(chunk["text"])
+        lengths[doc] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            rows.append(vocabulary.setdefault(term, len(vocabulary)))
+            cols.append(doc)
+            tfs.append(tf)
+
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    tfs = np.asarray(tfs, dtype=np.float32)
+
+    n_docs = len(chunks)
+    doc_freq = np.bincount(rows, minlength=len(vocabulary)).astype(np.float32)
+    idf = np.log1p((n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+    avg_length = float(lengths.mean()) if n_docs else 0.0
+    norm = k1 * (1 - b + b * lengths / avg_length) if n_docs else lengths
+    weights = idf[rows] * tfs * (k1 + 1) / (tfs + norm[cols])
+
+    postings = sparse.csr_matrix((weights, (rows, cols)), shape=(len(vocabulary), n_docs), dtype=np.float32)
+
+    def write_files(version_dir):
+        sparse.save_npz(os.path.join(version_dir, MATRIX_FILE), postings)
+        with open(os.path.join(version_dir, RECORDS_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "ids": [c["chunk_id"] for c in chunks],
+                "documents": [c["text"] for c in chunks],
+                "metadatas": [c["metadata"] for c in chunks],
+                "vocabulary": vocabulary,
+            }, f)
+
+    publish_index_version(index_dir, write_files)
+    return len(vocabulary)
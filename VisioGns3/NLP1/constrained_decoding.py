@@ -0,0 +1,214 @@
+"""
+Schema-constrained decoding for the topology model.
+
+The model was fine-tuned on responses produced by prepare_training_data.py,
+i.e. json.dumps({"machines": [...], "connections": [...]}) with the default
+separators:
+
+    {"machines": ["router 1", "pc 1"], "connections": [{"from": "router 1", "to": "pc 1"}]}
+
+TopologyGrammar is a character-level automaton accepting exactly that form,
+with connection endpoints restricted to machines already listed.
+TokenConstraint maps automaton states to the vocabulary entries that keep the
+output valid, so the decoder can mask every other logit. Generation stops as
+soon as the object closes, and the text always parses.
+"""
+
+import string
+from bisect import bisect_left
+
+# Characters allowed inside machine names
+NAME_CHARS = frozenset(string.ascii_letters + string.digits + " -_./")
+MAX_NAME_LENGTH = 64
+
+# Literal runs of the output: node -> (text, node entered once the text is matched)
+LITERALS = {
+    "open": ('{"machines": [', "machines_first"),
+    "machine_sep": (' "', "str:machine"),
+    "connections_key": (', "connections": [', "connections_first"),
+    "from_key": ('"from": "', "str:from"),
+    "to_key": (', "to": "', "str:to"),
+    "connection_end": ("}", "connections_next"),
+    "connection_sep": (' {"from": "', "str:from"),
+    "close": ("}", "done"),
+}
+
+# Branch points: node -> {character: node entered after it}
+CHOICES = {
+    "machines_first": {'"': "str:machine", "]": "connections_key"},
+    "machines_next": {",": "machine_sep", "]": "connections_key"},
+    "connections_first": {"{": "from_key", "]": "close"},
+    "connections_next": {",": "connection_sep", "]": "close"},
+}
+
+# Node entered when a string value's closing quote is read
+AFTER_STRING = {
+    "str:machine": "machines_next",
+    "str:from": "to_key",
+    "str:to": "connection_end",
+}
+
+
+class TopologyGrammar:
+    """
+    Automaton over the canonical topology JSON.
+
+    States are hashable tuples (node, literal position, string so far,
+    machines listed so far); None means the input can no longer be valid.
+    """
+
+    start = ("open", 0, "", ())
+
+    def step(self, state, ch):
+        """Return the state after reading one character, or None if it is not allowed."""
+        node, pos, buf, machines = state
+
+        if node in LITERALS:
+            text, after = LITERALS[node]
+            if text[pos] != ch:
+                return None
+            if pos + 1 == len(text):
+                return (after, 0, "", machines)
+            return (node, pos + 1, "", machines)
+
+        if node in CHOICES:
+            after = CHOICES[node].get(ch)
+            if after is None or (after == "from_key" and not machines):
+                return None  # a connection needs machines to refer to
+            return (after, 0, "", machines)
+
+        if node == "str:machine":
+            if ch == '"':
+                return (AFTER_STRING[node], 0, "", machines + (buf,)) if buf else None
+            if ch in NAME_CHARS and len(buf) < MAX_NAME_LENGTH:
+                return (node, 0, buf + ch, machines)
+            return None
+
+        if node in ("str:from", "str:to"):
+            if ch == '"':
+                return (AFTER_STRING[node], 0, "", machines) if buf in machines else None
+            prefix = buf + ch
+            if any(m.startswith(prefix) for m in machines):
+                return (node, 0, prefix, machines)
+            return None
+
+        return None  # done
+
+    def advance(self, state, text):
+        """Return the state after reading text, or None."""
+        for ch in text:
+            state = self.step(state, ch)
+            if state is None:
+                return None
+        return state
+
+    def next_chars(self, state):
+        """Characters that may follow in this state."""
+        node, pos, buf, machines = state
+        if node in LITERALS:
+            return {LITERALS[node][0][pos]}
+        if node in CHOICES:
+            return {ch for ch, after in CHOICES[node].items() if after != "from_key" or machines}
+        if node == "str:machine":
+            chars = set(NAME_CHARS) if len(buf) < MAX_NAME_LENGTH else set()
+            if buf:
+                chars.add('"')
+            return chars
+        if node in ("str:from", "str:to"):
+            chars = {m[len(buf)] for m in machines if len(m) > len(buf) and m.startswith(buf)}
+            if buf in machines:
+                chars.add('"')
+            return chars
+        return set()
+
+    def is_done(self, state):
+        return state is not None and state[0] == "done"
+
+
+class TokenConstraint:
+    """
+    Per-state sets of allowed token ids for a tokenizer's vocabulary.
+
+    Tokens are looked up in a sorted list of their texts, walking only the
+    characters the grammar allows. Free-text machine names would make that
+    walk visit most of the vocabulary, so in that state the tokens made only of
+    name characters come from a precomputed length-sorted array, and
+    only tokens that close the string are checked against the grammar.
+    """
+
+    def __init__(self, tokenizer, grammar=None, cache_size=4096):
+        import torch
+
+        self.grammar = grammar or TopologyGrammar()
+        self.cache_size = cache_size
+        self._cache = {}
+
+        special = set(tokenizer.all_special_ids)
+        texts = tokenizer.batch_decode([[i] for i in range(len(tokenizer))])
+        self.token_text = [None] * len(texts)
+
+        by_text = {}
+        name_tokens = []
+        self.closers = {}  # text from the first quote on -> [(token id, name characters before it)]
+        for token_id, text in enumerate(texts):
+            if token_id in special or not text or "\ufffd" in text:
+                continue
+            self.token_text[token_id] = text
+            by_text.setdefault(text, []).append(token_id)
+
+            run = 0
+            while run < len(text) and text[run] in NAME_CHARS:
+                run += 1
+            if run == len(text):
+                name_tokens.append((len(text), token_id))
+            elif text[run] == '"':
+                self.closers.setdefault(text[run:], []).append((token_id, run))
+
+        self.keys = sorted(by_text)
+        self.key_ids = [by_text[k] for k in self.keys]
+
+        name_tokens.sort()
+        self.name_token_lengths = [length for length, _ in name_tokens]
+        self.name_token_ids = torch.tensor([token_id for _, token_id in name_tokens], dtype=torch.long)
+
+    def text(self, token_id):
+        return self.token_text[token_id]
+
+    def allowed(self, state):
+        """LongTensor of the token ids that may be generated in this state."""
+        ids = self._cache.get(state)
+        if ids is None:
+            ids = self._allowed(state)
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[state] = ids
+        return ids
+
+    def _allowed(self, state):
+        import torch
+
+        node, _, buf, machines = state
+        found = []
+        if node == "str:machine":
+            room = MAX_NAME_LENGTH - len(buf)
+            name_part = self.name_token_ids[:bisect_left(self.name_token_lengths, room + 1)]
+            # Whether a closing token is valid only depends on what follows the quote
+            probe = (node, 0, buf or "x", machines)
+            for rest, members in self.closers.items():
+                if self.grammar.advance(probe, rest) is not None:
+                    found.extend(token_id for token_id, run in members if 0 < len(buf) + run <= MAX_NAME_LENGTH)
+            return torch.cat([name_part, torch.tensor(found, dtype=torch.long)])
+
+        self._walk("", 0, len(self.keys), state, found)
+        return torch.tensor(found, dtype=torch.long)
+
+    def _walk(self, prefix, lo, hi, state, found):
+        """Collect ids of the tokens in keys[lo:hi] (all starting with prefix) that the grammar accepts."""
+        if prefix and self.keys[lo] == prefix:
+            found.extend(self.key_ids[lo])
+        for ch in self.grammar.next_chars(state):
+            extended = prefix + ch
+            start = bisect_left(self.keys, extended, lo, hi)
+            end = bisect_left(self.keys, prefix + chr(ord(ch) + 1), start, hi)
+            if start < end:
+                self._walk(extended, start, end, self.grammar.step(state, ch), found)
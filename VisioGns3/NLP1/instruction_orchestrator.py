@@ -0,0 +1,96 @@
+"""
+Turns a chatbot instruction into machines and connections.
+
+Templated instructions are answered by instruction_parser without loading
+any model. Everything else goes to the topology model service
+(topology_model_server.py), with knowledge-base context from the RAG
+service placed before the instruction.
+"""
+
+import json
+import time
+
+from instruction_parser import CONFIDENCE_THRESHOLD, get_terminology, parse_instruction
+
+RAG_TOP_K = 2
+
+
+class InstructionOrchestrator:
+    """Rule-based fast path first, RAG + LLM only when the rules are not confident."""
+
+    def __init__(self, threshold=CONFIDENCE_THRESHOLD, use_rag=True, model_client=None, rag_client=None):
+        self.threshold = threshold
+        self.use_rag = use_rag
+        self.model_client = model_client
+        self.rag_client = rag_client
+        get_terminology()  # compile the parser's regexes now rather than on the first message
+
+    def try_rules(self, instruction):
+        """
+        Answer from the deterministic parser alone.
+
+        :return: result dictionary (see handle()), or None if the model is needed
+        """
+        start = time.perf_counter()
+        parsed = parse_instruction(instruction)
+        if parsed is None or parsed.confidence < self.threshold:
+            return None
+        return {
+            "source": "rules",
+            "topology": parsed.topology,
+            "confidence": parsed.confidence,
+            "machines": parsed.machines,
+            "connections": parsed.connections,
+            "seconds": time.perf_counter() - start,
+        }
+
+    def generate(self, instruction, on_token=None):
+        """
+        Ask the topology model, with retrieved context, for machines and connections.
+
+        :param on_token: called with each piece of text as the model streams it
+        """
+        # Imported here so the fast path never loads the clients
+        from topology_model_server import TopologyModelClient
+
+        start = time.perf_counter()
+        if self.model_client is None:
+            self.model_client = TopologyModelClient()
+        if not self.model_client.available():
+            raise RuntimeError("Topology model service is not running; start it with: "
+                               "python topology_model_server.py")
+
+        prompt = instruction
+        if self.use_rag:
+            from rag_service import RAGClient
+
+            if self.rag_client is None:
+                self.rag_client = RAGClient()
+            context = self.rag_client.format_context(self.rag_client.search(instruction, top_k=RAG_TOP_K))
+            prompt = f"{context}\n{instruction}"
+
+        pieces = []
+        for piece in self.model_client.stream(prompt, constrained=True):
+            pieces.append(piece)
+            if on_token is not None:
+                on_token(piece)
+        try:
+            topology = json.loads("".join(pieces))
+        except ValueError as e:
+            raise RuntimeError(f"Model output is not complete JSON: {e}")
+
+        return {
+            "source": "model",
+            "topology": None,
+            "confidence": None,
+            "machines": topology["machines"],
+            "connections": topology["connections"],
+            "seconds": time.perf_counter() - start,
+        }
+
+    def handle(self, instruction, on_token=None):
+        """
+        Return {"source", "topology", "confidence", "machines", "connections", "seconds"}
+        for an instruction; source is "rules" or "model".
+        """
+        return self.try_rules(instruction) or self.generate(instruction, on_token)
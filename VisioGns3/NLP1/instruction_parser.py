@@ -0,0 +1,345 @@
+"""
+Deterministic parser for common topology instructions.
+
+Most chatbot prompts follow the templates dataset_creation.py trained the
+model on ("Ring topology with 5 routers", "Star topology with router 1
+connected to 8 pcs", ...). Those are recognised here with regular
+expressions built from knowledge_base/terminology/network_terminology.json,
+and machines and connections are built directly, in the same form and order
+as the training data. No model is loaded.
+
+parse_instruction() returns None when it cannot determine a topology;
+otherwise a ParsedInstruction whose confidence drops when the prompt holds
+numbers, topology words or device types it did not use, a negation the
+templates never contain, or more devices than MAX_DEVICES. Callers fall back
+to the model below CONFIDENCE_THRESHOLD (see instruction_orchestrator.py).
+"""
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+
+# ---------------- CONFIG ---------------- #
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TERMINOLOGY_FILE = os.path.join(BASE_DIR, "knowledge_base", "terminology", "network_terminology.json")
+
+CONFIDENCE_THRESHOLD = 0.9
+
+# Largest topology the rules build; the templates stay well below it, and a
+# "full mesh of 3000 routers" would otherwise build millions of links on the GUI's behalf
+MAX_DEVICES = 200
+
+# Phrases the dataset templates use that the terminology file does not list
+EXTRA_TOPOLOGY_PHRASES = {
+    "star": ["hub and spoke", "star configuration", "at center"],
+    "mesh": ["full mesh"],
+    "partial_mesh": ["partial mesh"],
+    "daisy_chain": ["in a chain", "linear sequence"],
+    "three_tier": ["three-tier", "multi-tier", "layered", "core-distribution-access"],
+    "cascade": ["cascade", "cascaded"],
+    "point_to_point": ["point-to-point", "direct connections", "pairs of"],
+}
+
+# connection_phrases groups that imply a topology
+CONNECTION_PHRASE_TOPOLOGIES = {
+    "sequential": "daisy_chain",
+    "centralized": "star",
+    "hierarchical": "tree",
+    "redundant": "partial_mesh",
+}
+
+# Builders are tried in this order when several topology words appear
+# ("hierarchical star network ..."); the first that succeeds wins. Mesh comes
+# late because "interconnected" is also an everyday connection phrase.
+TOPOLOGY_PRIORITY = ["point_to_point", "cascade", "three_tier", "tree", "bus", "star",
+                     "ring", "daisy_chain", "mesh", "partial_mesh", "hybrid"]
+
+NUMBER_WORDS = {w: str(i) for i, w in enumerate(
+    "zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen "
+    "sixteen seventeen eighteen nineteen twenty".split())}
+
+# "... with no link between router 1 and router 2": exclusions the builders cannot express
+NEGATION_RE = re.compile(r"\b(no|not|without|except)\b")
+
+
+@dataclass
+class ParsedInstruction:
+    topology: str
+    machines: list
+    connections: list
+    confidence: float
+    notes: list = field(default_factory=list)
+
+    def to_dict(self):
+        return {"machines": self.machines, "connections": self.connections}
+
+
+# ---------------- TERMINOLOGY ---------------- #
+def alternation(words):
+    """Regex alternation matching the longest phrase first."""
+    return "|".join(re.escape(w) for w in sorted(set(words), key=len, reverse=True))
+
+
+class Terminology:
+    """Regular expressions compiled once from the terminology tables."""
+
+    def __init__(self, path=TERMINOLOGY_FILE):
+        with open(path, "r", encoding="utf-8") as f:
+            tables = json.load(f)
+
+        # device word (singular or plural) -> canonical device type
+        self.device_words = {}
+        abbreviations = {}
+        for device, synonyms in tables["device_type_synonyms"].items():
+            for word in [device, *synonyms]:
+                if word.isupper():
+                    abbreviations[word] = device  # "R1", "SW2": case-sensitive
+                    continue
+                word = word.lower()
+                for form in (word, word + "s", word + "es"):
+                    self.device_words.setdefault(form, device)
+        self.abbreviations = abbreviations
+
+        # topology phrase -> category; later tables override earlier ones
+        self.topology_phrases = {}
+        for group, topology in CONNECTION_PHRASE_TOPOLOGIES.items():
+            for phrase in tables["connection_phrases"].get(group, []):
+                self.topology_phrases[phrase.lower()] = topology
+        for table in ("topology_keywords", "topology_synonyms"):
+            for topology, phrases in tables[table].items():
+                for phrase in phrases:
+                    self.topology_phrases[phrase.lower()] = topology
+        for topology, phrases in EXTRA_TOPOLOGY_PHRASES.items():
+            for phrase in phrases:
+                self.topology_phrases[phrase] = topology
+
+        devices = alternation(self.device_words)
+        self.number_word_re = re.compile(rf"\b({alternation(NUMBER_WORDS)})\s+(?=(?:{devices})\b)", re.IGNORECASE)
+        self.named_re = re.compile(rf"\b({devices})\s+(\d+)\b")
+        self.abbreviation_re = re.compile(rf"\b({alternation(abbreviations)})\s?(\d+)\b")
+        self.count_re = re.compile(rf"\b(\d+)\s+({devices})\b")
+        self.device_re = re.compile(rf"\b({devices})\b")
+        self.topology_re = re.compile(rf"\b({alternation(self.topology_phrases)})\b")
+        self.number_re = re.compile(r"\d+")
+
+
+_terminology = None
+
+
+def get_terminology():
+    """Load the terminology tables once per process."""
+    global _terminology
+    if _terminology is None:
+        _terminology = Terminology()
+    return _terminology
+
+
+# ---------------- MENTIONS ---------------- #
+class Mentions:
+    """Devices, counts and topology words found in one instruction."""
+
+    def __init__(self, text, terms):
+        # "three routers" -> "3 routers"; cased copy for the case-sensitive abbreviations
+        cased = terms.number_word_re.sub(lambda m: NUMBER_WORDS[m.group(1).lower()] + " ", text)
+        self.text = cased.lower()
+        self.used_numbers = set()
+
+        # Named devices: "router 1", "R1"
+        self.named = []
+        for m in terms.named_re.finditer(self.text):
+            self.named.append((terms.device_words[m.group(1)], int(m.group(2))))
+            self.used_numbers.add(m.start(2))
+        for m in terms.abbreviation_re.finditer(cased):
+            self.named.append((terms.abbreviations[m.group(1)], int(m.group(2))))
+            self.used_numbers.add(m.start(2))
+
+        # Counted groups: "8 pcs", "3 switchs"
+        self.counts = []
+        for m in terms.count_re.finditer(self.text):
+            if m.start(1) in self.used_numbers:
+                continue
+            self.counts.append((terms.device_words[m.group(2)], int(m.group(1))))
+            self.used_numbers.add(m.start(1))
+
+        self.devices = [terms.device_words[m.group(1)] for m in terms.device_re.finditer(self.text)]
+        self.numbers = [(m.start(), int(m.group())) for m in terms.number_re.finditer(self.text)]
+
+        self.topologies = []
+        for m in terms.topology_re.finditer(self.text):
+            topology = terms.topology_phrases[m.group(1)]
+            if topology not in self.topologies:
+                self.topologies.append(topology)
+
+    def unused_numbers(self):
+        return [n for pos, n in self.numbers if pos not in self.used_numbers]
+
+
+def names(device, count, start=1):
+    return [f"{device} {i}" for i in range(start, start + count)]
+
+
+# ---------------- BUILDERS ---------------- #
+# Each returns (machines, connections) or None when the mentions do not pin
+# the topology down. Names and ordering follow dataset_creation.py.
+
+def build_ring(m):
+    if len(m.counts) != 1 or m.counts[0][1] < 3:
+        return None
+    machines = names(*m.counts[0])
+    return machines, [{"from": a, "to": machines[(i + 1) % len(machines)]} for i, a in enumerate(machines)]
+
+
+def build_chain(m):
+    if len(m.counts) != 1 or m.counts[0][1] < 2:
+        return None
+    if any(device != m.counts[0][0] for device, _ in m.named):
+        return None
+    machines = names(*m.counts[0])
+    return machines, [{"from": a, "to": b} for a, b in zip(machines, machines[1:])]
+
+
+def build_full_mesh(m):
+    if len(m.counts) != 1 or m.counts[0][1] < 2:
+        return None
+    machines = names(*m.counts[0])
+    return machines, [{"from": a, "to": b} for i, a in enumerate(machines) for b in machines[i + 1:]]
+
+
+def build_star(m):
+    """A named centre ("router 1") with a counted group of peripherals."""
+    if len(m.named) != 1 or len(m.counts) != 1:
+        return None
+    center = f"{m.named[0][0]} {m.named[0][1]}"
+    peripherals = names(*m.counts[0])
+    if center in peripherals:
+        return None
+    return [center] + peripherals, [{"from": center, "to": p} for p in peripherals]
+
+
+def build_tree(m):
+    """Named root, counted branches, counted leaves split evenly across the branches."""
+    if len(m.named) != 1 or len(m.counts) != 2:
+        return None
+    root = f"{m.named[0][0]} {m.named[0][1]}"
+    branches, leaves = names(*m.counts[0]), names(*m.counts[1])
+    if len(leaves) % len(branches):
+        return None
+    per_branch = len(leaves) // len(branches)
+    connections = [{"from": root, "to": b} for b in branches]
+    for i, branch in enumerate(branches):
+        connections += [{"from": branch, "to": leaf} for leaf in leaves[i * per_branch:(i + 1) * per_branch]]
+    return [root] + branches + leaves, connections
+
+
+def build_three_tier(m):
+    """Routers, switches and end devices; switches round-robin on routers, end devices in blocks."""
+    counts = dict(m.counts)
+    if len(m.counts) != 3 or "router" not in counts or "switch" not in counts:
+        return None
+    end_device = next(device for device, _ in m.counts if device not in ("router", "switch"))
+    routers, switches = names("router", counts["router"]), names("switch", counts["switch"])
+    end_devices = names(end_device, counts[end_device])
+
+    connections = [{"from": routers[i % len(routers)], "to": s} for i, s in enumerate(switches)]
+    per_switch = len(end_devices) // len(switches)
+    for i, switch in enumerate(switches):
+        start = i * per_switch
+        end = start + per_switch if i < len(switches) - 1 else len(end_devices)
+        connections += [{"from": switch, "to": d} for d in end_devices[start:end]]
+    return routers + switches + end_devices, connections
+
+
+def build_cascade(m):
+    """A chain of devices, each with its own block of endpoints."""
+    if len(m.counts) != 2:
+        return None
+    (device, chained), (endpoint, second) = m.counts
+    if "each with" in m.text:
+        per_device = second
+    elif second % chained == 0:
+        per_device = second // chained
+    else:
+        return None
+    cascade, endpoints = names(device, chained), names(endpoint, chained * per_device)
+    connections = [{"from": a, "to": b} for a, b in zip(cascade, cascade[1:])]
+    for i, d in enumerate(cascade):
+        connections += [{"from": d, "to": e} for e in endpoints[i * per_device:(i + 1) * per_device]]
+    return cascade + endpoints, connections
+
+
+def build_point_to_point(m):
+    """N pairs "<type1> i" -- "<type2> i"."""
+    unused = m.unused_numbers()
+    if m.counts or m.named or len(unused) != 1 or len(m.devices) != 2 or m.devices[0] == m.devices[1]:
+        return None
+    pairs = unused[0]
+    machines, connections = [], []
+    for a, b in zip(names(m.devices[0], pairs), names(m.devices[1], pairs)):
+        machines += [a, b]
+        connections.append({"from": a, "to": b})
+    m.used_numbers.update(pos for pos, _ in m.numbers)
+    return machines, connections
+
+
+BUILDERS = {
+    "ring": build_ring,
+    "daisy_chain": build_chain,
+    "mesh": build_full_mesh,
+    "star": build_star,
+    "bus": build_star,
+    "tree": build_tree,
+    "three_tier": build_three_tier,
+    "cascade": build_cascade,
+    "point_to_point": build_point_to_point,
+    # partial_mesh and hybrid are not deterministic: always left to the model
+}
+
+
+def parse_instruction(text, terminology=None):
+    """
+    Build machines and connections for a templated instruction.
+
+    :return: ParsedInstruction, or None if no rule applies
+    """
+    terms = terminology or get_terminology()
+    mentions = Mentions(text, terms)
+    oversized = [n for _, n in mentions.counts if n > MAX_DEVICES] + \
+                [n for n in mentions.unused_numbers() if n > MAX_DEVICES]
+
+    for topology in sorted(mentions.topologies, key=TOPOLOGY_PRIORITY.index):
+        builder = BUILDERS.get(topology)
+        if builder is None:
+            continue
+        if oversized:
+            # Not built at all: the size alone is enough to leave it to the model
+            return ParsedInstruction(topology, [], [], 0.0, [f"more than {MAX_DEVICES} devices: {oversized}"])
+        built = builder(mentions)
+        if built is None:
+            continue
+
+        machines, connections = built
+        confidence, notes = 1.0, []
+        unused = mentions.unused_numbers()
+        if unused:
+            confidence *= 0.5 ** len(unused)
+            notes.append(f"numbers not understood: {unused}")
+        others = [t for t in mentions.topologies if t != topology and BUILDERS.get(t) is not None]
+        if others:
+            confidence *= 0.9 ** len(others)
+            notes.append(f"also mentions: {', '.join(others)}")
+        built_devices = {machine.rsplit(" ", 1)[0] for machine in machines}
+        missing = sorted(set(mentions.devices) - built_devices)
+        if missing:
+            confidence *= 0.5 ** len(missing)
+            notes.append(f"devices not built: {', '.join(missing)}")
+        if len(machines) > MAX_DEVICES:
+            confidence *= 0.5
+            notes.append(f"{len(machines)} devices, more than {MAX_DEVICES}")
+        negation = NEGATION_RE.search(mentions.text)
+        if negation:
+            confidence *= 0.5
+            notes.append(f"negation not understood: {negation.group(1)}")
+        return ParsedInstruction(topology, machines, connections, confidence, notes)
+
+    return None
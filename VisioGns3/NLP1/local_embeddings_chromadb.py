@@ -1,46 +1,201 @@
 import os
 import json
+import time
+import hashlib
+import sqlite3
+import numpy as np
 from sentence_transformers import SentenceTransformer
 import chromadb
+from vector_index import current_index_dir, export_collection
+import bm25_index
 
 # ---------------- CONFIG ---------------- #
-BASE_DIR = "/home/athaar/INDA/VisioGns3/NLP1"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 CHUNKS_JSON = os.path.join(BASE_DIR, "rag_preprocessed_chunks.json")
 CHROMA_DB_DIR = os.path.join(BASE_DIR, "chroma_db")
 COLLECTION_NAME = "network_docs"
+MODEL_NAME = "all-MiniLM-L6-v2"  # local, lightweight
 
-# ---------------- LOAD CHUNKS ---------------- #
-print(f"Loading chunks from: {CHUNKS_JSON}")
-with open(CHUNKS_JSON, "r", encoding="utf-8") as f:
-    chunks = json.load(f)
+# Embeddings already computed, keyed by (model, sha256 of the chunk text)
+EMBEDDING_CACHE_DB = os.path.join(BASE_DIR, "embedding_cache.sqlite")
+# Bumped after every index change so readers can drop cached results
+INDEX_VERSION_FILE = os.path.join(CHROMA_DB_DIR, "index_version.json")
+# Brute-force NumPy copy of the collection (RAGPipeline backend="numpy")
+VECTOR_INDEX_DIR = os.path.join(BASE_DIR, "vector_index")
+# BM25 inverted index over the same chunks (RAGPipeline hybrid search)
+BM25_INDEX_DIR = os.path.join(BASE_DIR, "bm25_index")
 
-print(f"Loaded {len(chunks)} chunks from {CHUNKS_JSON}")
+ENCODE_BATCH_SIZE = 64
+WRITE_BATCH_SIZE = 1000
 
-# ---------------- EMBEDDING ---------------- #
-print("Loading embedding model...")
-model = SentenceTransformer("all-MiniLM-L6-v2")  # local, lightweight
 
-texts = [c["text"] for c in chunks]
-print("Generating embeddings...")
-embeddings = model.encode(texts, show_progress_bar=True)
+def text_hash(text):
+    """SHA-256 of a chunk's text; identifies its embedding."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def content_hash(chunk):
+    """SHA-256 of a chunk's text and metadata; identifies what is stored in ChromaDB."""
+    payload = json.dumps({"text": chunk["text"], "metadata": chunk["metadata"]}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------- EMBEDDING CACHE ---------------- #
+class EmbeddingCache:
+    """On-disk store of float32 embedding vectors keyed by (model, text hash)."""
+
+    def __init__(self, path, model_name):
+        self.model_name = model_name
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, hash TEXT NOT NULL, vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, hash))"
+        )
+
+    def get_many(self, hashes):
+        """Return {hash: vector} for the hashes already cached."""
+        found = {}
+        hashes = list(hashes)
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start:start + 500]
+            rows = self.db.execute(
+                f"SELECT hash, vector FROM embeddings WHERE model = ? AND hash IN ({','.join('?' * len(batch))})",
+                [self.model_name, *batch],
+            )
+            for h, vector in rows:
+                found[h] = np.frombuffer(vector, dtype=np.float32)
+        return found
+
+    def put_many(self, items):
+        """Store (hash, vector) pairs."""
+        self.db.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, hash, vector) VALUES (?, ?, ?)",
+            [(self.model_name, h, np.asarray(vector, dtype=np.float32).tobytes()) for h, vector in items],
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def embed_chunks(chunks, model_name=MODEL_NAME, cache_path=EMBEDDING_CACHE_DB):
+    """
+    Return one embedding per chunk, encoding only texts missing from the cache.
+    """
+    cache = EmbeddingCache(cache_path, model_name)
+    try:
+        hashes = [text_hash(c["text"]) for c in chunks]
+        vectors = cache.get_many(set(hashes))
+
+        missing = {}
+        for h, c in zip(hashes, chunks):
+            if h not in vectors:
+                missing.setdefault(h, c["text"])
+
+        print(f"Embeddings cached: {len(hashes) - len(missing)}, to encode: {len(missing)}")
+        if missing:
+            print("Loading embedding model...")
+            model = SentenceTransformer(model_name)
+            print("Generating embeddings...")
+            encoded = model.encode(list(missing.values()), batch_size=ENCODE_BATCH_SIZE, show_progress_bar=True)
+            new_vectors = list(zip(missing.keys(), encoded))
+            cache.put_many(new_vectors)
+            vectors.update((h, np.asarray(v, dtype=np.float32)) for h, v in new_vectors)
+    finally:
+        cache.close()
+
+    return [vectors[h] for h in hashes]
+
 
 # ---------------- CHROMA DB (new API) ---------------- #
-# ✅ new-style client initialization
-client = chromadb.PersistentClient(path=CHROMA_DB_DIR)
+def bump_index_version(chunk_count):
+    """Record that the collection changed."""
+    version = 0
+    try:
+        with open(INDEX_VERSION_FILE, "r", encoding="utf-8") as f:
+            version = json.load(f).get("version", 0)
+    except (OSError, ValueError):
+        pass
+
+    tmp_path = INDEX_VERSION_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version + 1, "updated_at": time.time(), "chunks": chunk_count}, f)
+    os.replace(tmp_path, INDEX_VERSION_FILE)
+    return version + 1
+
+
+def sync_collection(collection, chunks):
+    """
+    Make the collection match the chunk list: upsert new or changed chunks in
+    large batches and delete chunks that no longer exist.
+
+    :return: (upserted, deleted) counts.
+    """
+    existing = collection.get(include=["metadatas"])
+    stored = {
+        chunk_id: (metadata or {}).get("content_hash")
+        for chunk_id, metadata in zip(existing["ids"], existing["metadatas"])
+    }
+
+    changed = []
+    for c in chunks:
+        h = content_hash(c)
+        if stored.get(c["chunk_id"]) != h:
+            changed.append((c, h))
+
+    current_ids = {c["chunk_id"] for c in chunks}
+    stale_ids = [chunk_id for chunk_id in stored if chunk_id not in current_ids]
+
+    if changed:
+        embeddings = embed_chunks([c for c, _ in changed])
+        for start in range(0, len(changed), WRITE_BATCH_SIZE):
+            batch = changed[start:start + WRITE_BATCH_SIZE]
+            collection.upsert(
+                ids=[c["chunk_id"] for c, _ in batch],
+                embeddings=[e.tolist() for e in embeddings[start:start + WRITE_BATCH_SIZE]],
+                metadatas=[{**c["metadata"], "content_hash": h} for c, h in batch],
+                documents=[c["text"] for c, _ in batch],
+            )
+
+    for start in range(0, len(stale_ids), WRITE_BATCH_SIZE):
+        collection.delete(ids=stale_ids[start:start + WRITE_BATCH_SIZE])
+
+    return len(changed), len(stale_ids)
+
+
+def main():
+    # ---------------- LOAD CHUNKS ---------------- #
+    print(f"Loading chunks from: {CHUNKS_JSON}")
+    with open(CHUNKS_JSON, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+
+    print(f"Loaded {len(chunks)} chunks from {CHUNKS_JSON}")
+
+    # ✅ new-style client initialization
+    client = chromadb.PersistentClient(path=CHROMA_DB_DIR)
+    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+
+    upserted, deleted = sync_collection(collection, chunks)
+
+    if upserted or deleted or current_index_dir(VECTOR_INDEX_DIR) is None:
+        exported = export_collection(collection, VECTOR_INDEX_DIR)
+        print(f"NumPy vector index written to {VECTOR_INDEX_DIR} ({exported} vectors).")
+
+    if upserted or deleted or current_index_dir(BM25_INDEX_DIR) is None:
+        terms = bm25_index.build_index(BM25_INDEX_DIR, chunks)
+        print(f"BM25 index written to {BM25_INDEX_DIR} ({terms} terms).")
 
-# Delete existing collection if exists
-if COLLECTION_NAME in [c.name for c in client.list_collections()]:
-    client.delete_collection(COLLECTION_NAME)
+    # Bumped only once every derived index is written, so readers that reload
+    # on a new version never pick up a half-updated set
+    if upserted or deleted:
+        version = bump_index_version(len(chunks))
+        print(f"Index version {version}: {upserted} chunks added or updated, {deleted} removed.")
+    else:
+        print("Index already up to date.")
 
-collection = client.create_collection(name=COLLECTION_NAME)
+    print(f"✅ ChromaDB stored at {CHROMA_DB_DIR} with {len(chunks)} documents.")
 
-# Add chunks to ChromaDB
-for c, emb in zip(chunks, embeddings):
-    collection.add(
-        ids=[c["chunk_id"]],
-        embeddings=[emb.tolist()],
-        metadatas=[c["metadata"]],
-        documents=[c["text"]]
-    )
 
-print(f"✅ ChromaDB stored at {CHROMA_DB_DIR} with {len(chunks)} documents.")
+if __name__ == "__main__":
+    main()
@@ -29,10 +29,10 @@
 #         print(f"Score: {results['distances'][0][i]}")
 
 
-from rag_pipeline import RAGPipeline
-from sentence_transformers import SentenceTransformer
+from rag_service import RAGClient
 
-rag = RAGPipeline(
+# Uses the warm rag_service.py if it is running, otherwise loads the pipeline locally
+rag = RAGClient(
     chroma_path="/home/athaar/INDA/VisioGns3/NLP1/chroma_db",
     model_path="all-MiniLM-L6-v2"
 )
@@ -1,5 +1,127 @@
-import chromadb
-from sentence_transformers import SentenceTransformer
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Query result fields holding one list per query
+PER_QUERY_KEYS = ("ids", "documents", "metadatas", "distances", "scores", "embeddings", "uris", "data")
+
+
+def format_context(results) -> str:
+    """
+    Convert retrieved docs into a single text block
+    suitable for LLM prompting.
+    """
+
+    docs = results["documents"][0]
+    # Hybrid results carry a fused score for every document; dense-only ones a distance
+    scores = results["scores"][0] if results.get("scores") else results["distances"][0]
+
+    formatted = []
+    for i, (doc, score) in enumerate(zip(docs, scores)):
+        formatted.append(
+            f"### Retrieved Document {i+1} (score={score})\n{doc}\n"
+        )
+
+    return "\n".join(formatted)
+
+
+# Written by local_embeddings_chromadb.py whenever the collection changes
+INDEX_VERSION_FILE = "index_version.json"
+
+# Retrieval backends: "chroma" queries the ChromaDB collection, "numpy" the
+# memory-mapped vector_index.NumpyVectorIndex exported from it
+BACKENDS = ("chroma", "numpy")
+DEFAULT_VECTOR_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vector_index")
+# BM25 inverted index written next to the embeddings (bm25_index.build_index)
+DEFAULT_BM25_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bm25_index")
+
+# Reciprocal-rank fusion: score = sum over rankings of 1 / (RRF_K + rank)
+RRF_K = 60
+# Depth of each ranking fed into the fusion
+HYBRID_CANDIDATES = 20
+
+EMBEDDING_CACHE_SIZE = 1024
+RESULT_CACHE_SIZE = 256
+LATENCY_SAMPLES = 1000
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share cache entries."""
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class LRUCache:
+    """Bounded least-recently-used cache that counts hits and misses."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        """Return the cached value or None."""
+        if key in self._data:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return self._data[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def fuse_results(dense, lexical, bm25, top_k, rrf_k=RRF_K):
+    """
+    Merge one query's dense result and BM25 hits by reciprocal-rank fusion.
+
+    :param dense: single-query result dictionary from the vector backend
+    :param lexical: (chunk index, score) pairs from BM25Index.search_many
+    :param bm25: the BM25Index the chunk indices refer to
+    :return: single-query result dictionary with the top_k fused hits; "scores"
+             holds the fused score, "distances" the dense distance (None for
+             chunks only BM25 found)
+    """
+    fused = {}
+    records = {}
+    for rank, chunk_id in enumerate(dense["ids"][0], start=1):
+        fused[chunk_id] = 1.0 / (rrf_k + rank)
+        records[chunk_id] = (dense["documents"][0][rank - 1], dense["metadatas"][0][rank - 1],
+                             dense["distances"][0][rank - 1])
+    for rank, (i, _) in enumerate(lexical, start=1):
+        chunk_id = bm25.ids[i]
+        fused[chunk_id] = fused.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+        records.setdefault(chunk_id, (bm25.documents[i], bm25.metadatas[i], None))
+
+    top = sorted(fused, key=fused.get, reverse=True)[:top_k]
+    return {
+        "ids": [top],
+        "documents": [[records[c][0] for c in top]],
+        "metadatas": [[records[c][1] for c in top]],
+        "distances": [[records[c][2] for c in top]],
+        "scores": [[fused[c] for c in top]],
+        "embeddings": None, "uris": None, "data": None,
+        "included": ["metadatas", "documents", "distances", "scores"],
+    }
 
 
 class RAGPipeline:
@@ -8,32 +130,118 @@ class RAGPipeline:
     - Loads ChromaDB stored locally
     - Loads a local SentenceTransformer embedding model
     - Provides embed(), search(), and format_context()
+    - Caches query embeddings and search results (see stats())
+    - Fuses dense and BM25 rankings when hybrid is enabled
     """
 
-    def __init__(self, chroma_path: str, model_path: str):
+    def __init__(self, chroma_path: str, model_path: str,
+                 embedding_cache_size: int = EMBEDDING_CACHE_SIZE, result_cache_size: int = RESULT_CACHE_SIZE,
+                 backend: str = "chroma", vector_index_dir: str = DEFAULT_VECTOR_INDEX_DIR,
+                 hybrid: bool = True, bm25_index_dir: str = DEFAULT_BM25_INDEX_DIR):
         """
         Initialize RAG pipeline with:
         - chroma_path: folder where ChromaDB is stored
         - model_path: local folder of sentence-transformer model
+        - embedding_cache_size / result_cache_size: LRU bounds, 0 disables a cache
+        - backend: "chroma" or "numpy" (brute-force search over vector_index_dir)
+        - hybrid: fuse BM25 results from bm25_index_dir into every search
+          (dense-only if that index has not been built)
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown retrieval backend: {backend}")
+        self.backend = backend
+        self.vector_index_dir = vector_index_dir
+        self.bm25_index_dir = bm25_index_dir
+        self.bm25 = None
+        self.version_path = os.path.join(chroma_path, INDEX_VERSION_FILE)
+        self.embedding_cache = LRUCache(embedding_cache_size)
+        self.result_cache = LRUCache(result_cache_size)
+        self._result_version = None
+        self._latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._latencies_lock = threading.Lock()  # searches append from several threads
+
+        # Imported here so clients that only format results (rag_service.RAGClient)
+        # do not pay for loading torch and ChromaDB
+        from sentence_transformers import SentenceTransformer
 
         print("[RAG] Loading embedding model...")
         self.model = SentenceTransformer(model_path)
 
-        print("[RAG] Connecting to ChromaDB...")
-        # FIX: Use PersistentClient instead of deprecated Client()
-        self.client = chromadb.PersistentClient(path=chroma_path)
+        if backend == "numpy":
+            from vector_index import MANIFEST_FILE
 
-        # Load your existing collection
-        self.collection = self.client.get_collection("network_docs")
+            print("[RAG] Loading vector index...")
+            self.version_path = os.path.join(vector_index_dir, MANIFEST_FILE)
+        else:
+            import chromadb
+
+            print("[RAG] Connecting to ChromaDB...")
+            # FIX: Use PersistentClient instead of deprecated Client()
+            self.client = chromadb.PersistentClient(path=chroma_path)
+
+            # Load your existing collection
+            self.collection = self.client.get_collection("network_docs")
+
+        if hybrid:
+            print("[RAG] Loading BM25 index...")
+        self.hybrid = hybrid
+        self._indexes_version = self.collection_version()
+        self._load_indexes()
 
         print("[RAG] RAG pipeline initialized successfully.\n")
 
+    def _load_indexes(self):
+        """(Re)load the on-disk indexes; ChromaDB reads its own files live."""
+        if self.backend == "numpy":
+            from vector_index import NumpyVectorIndex
+
+            # Same query() interface as a ChromaDB collection
+            self.collection = NumpyVectorIndex(self.vector_index_dir)
+
+        if self.hybrid:
+            from bm25_index import BM25Index
+            from vector_index import current_index_dir
+
+            if current_index_dir(self.bm25_index_dir) is not None:
+                self.bm25 = BM25Index(self.bm25_index_dir)
+            else:
+                print(f"[RAG] No BM25 index in {self.bm25_index_dir}, searching embeddings only.")
+                self.bm25 = None
+
     # ------------------------------------------------------------------
 
     def embed(self, text: str):
         """Return embedding vector for a piece of text."""
-        return self.model.encode([text]).tolist()[0]
+        return self.embed_many([text])[0]
+
+    def embed_many(self, texts):
+        """Return embedding vectors for several texts, encoding only cache misses in a single call."""
+        keys = [normalize_query(text) for text in texts]
+        vectors = [self.embedding_cache.get(key) for key in keys]
+
+        missing = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+
+        if missing:
+            encoded = dict(zip(missing, self.model.encode(list(missing.values())).tolist()))
+            for key, vector in encoded.items():
+                self.embedding_cache.put(key, vector)
+            vectors = [encoded[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+
+        return vectors
+
+    def collection_version(self):
+        """
+        Identify the current state of the index from its version file.
+        Cached results are dropped whenever this changes.
+        """
+        try:
+            st = os.stat(self.version_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
 
     # ------------------------------------------------------------------
 
@@ -43,14 +251,75 @@ class RAGPipeline:
         - Embed query
         - Retrieve nearest documents
         """
-        q_emb = self.embed(query)
+        return self.search_many([query], top_k)[0]
 
-        results = self.collection.query(
-            query_embeddings=[q_emb],
-            n_results=top_k
-        )
+    def search_many(self, queries, top_k: int = 3):
+        """
+        Search ChromaDB for several queries at once:
+        - One encode call for all queries
+        - One collection query for all embeddings
+        - With hybrid enabled, one sparse BM25 product for all queries,
+          fused with the dense ranking by reciprocal-rank fusion
+
+        Returns one result dictionary per query, shaped like search().
+        Results are cached per (normalized query, top_k) until the index is re-built.
+        """
+        start = time.perf_counter()
+
+        version = self.collection_version()
+        if version != self._result_version:
+            self.result_cache.clear()
+            self._result_version = version
+        if version != self._indexes_version:
+            self._load_indexes()
+            self._indexes_version = version
+
+        keys = [(normalize_query(query), top_k, version) for query in queries]
+        per_query = [self.result_cache.get(key) for key in keys]
+        pending = [i for i, result in enumerate(per_query) if result is None]
+
+        if pending:
+            q_embs = self.embed_many([queries[i] for i in pending])
+
+            depth = max(top_k, HYBRID_CANDIDATES) if self.bm25 is not None else top_k
+            results = self.collection.query(
+                query_embeddings=q_embs,
+                n_results=depth
+            )
+            if self.bm25 is not None:
+                lexical = self.bm25.search_many([queries[i] for i in pending], depth)
+
+            # Split the batched per-query lists back into single-query results
+            for n, i in enumerate(pending):
+                per_query[i] = {
+                    key: [value[n]] if key in PER_QUERY_KEYS and value is not None else value
+                    for key, value in results.items()
+                }
+                if self.bm25 is not None:
+                    per_query[i] = fuse_results(per_query[i], lexical[n], self.bm25, top_k)
+                self.result_cache.put(keys[i], per_query[i])
 
-        return results
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._latencies_lock:
+            self._latencies.append(elapsed_ms)
+        return per_query
+
+    def stats(self):
+        """Cache hit rates and search latency (milliseconds) over the recent searches."""
+        with self._latencies_lock:
+            latencies = list(self._latencies)
+        latencies.sort()
+        count = len(latencies)
+        return {
+            "embedding_cache": self.embedding_cache.stats(),
+            "result_cache": self.result_cache.stats(),
+            "searches": count,
+            "latency_ms": {
+                "mean": sum(latencies) / count if count else 0.0,
+                "p50": latencies[count // 2] if count else 0.0,
+                "p95": latencies[min(count - 1, int(count * 0.95))] if count else 0.0,
+            },
+        }
 
     # ------------------------------------------------------------------
 
@@ -59,14 +328,4 @@ class RAGPipeline:
         Convert retrieved docs into a single text block
         suitable for LLM prompting.
         """
-
-        docs = results["documents"][0]
-        scores = results["distances"][0]
-
-        formatted = []
-        for i, (doc, score) in enumerate(zip(docs, scores)):
-            formatted.append(
-                f"### Retrieved Document {i+1} (score={score})\n{doc}\n"
-            )
-
-        return "\n".join(formatted)
+        return format_context(results)
@@ -0,0 +1,258 @@
+"""
+Long-lived local RAG query service.
+
+Loading the SentenceTransformer model and opening ChromaDB takes seconds, so
+instead of every caller building its own RAGPipeline, this service does it
+once and answers searches over localhost HTTP:
+
+    POST /search   {"query": "...", "top_k": 3, "context": true}
+    GET  /stats    cache hit rates and search latency
+    GET  /health
+
+Queries arriving together are batched: the batcher thread waits a few
+milliseconds for more requests and serves them all with one encode call and
+one collection query. RAGClient talks to the service and falls back to a
+local RAGPipeline when the service is not running.
+
+Run with:  python rag_service.py [--port 8765]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rag_pipeline import BACKENDS, PER_QUERY_KEYS, RAGPipeline, format_context
+
+# ---------------- CONFIG ---------------- #
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CHROMA_PATH = os.path.join(BASE_DIR, "chroma_db")
+MODEL_PATH = "all-MiniLM-L6-v2"
+
+HOST = "127.0.0.1"
+PORT = 8765
+BATCH_WINDOW = 0.005   # seconds to wait for more queries once one arrives
+MAX_BATCH = 32
+CLIENT_TIMEOUT = 5.0   # seconds
+
+
+def truncate_results(results, top_k):
+    """Keep only the first top_k hits of a single-query result."""
+    return {
+        key: [value[0][:top_k]] if key in PER_QUERY_KEYS and value is not None else value
+        for key, value in results.items()
+    }
+
+
+class QueryBatcher:
+    """Collects concurrent search requests and runs them through RAGPipeline.search_many together."""
+
+    def __init__(self, pipeline, window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.pipeline = pipeline
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="rag-batcher", daemon=True)
+        self._thread.start()
+
+    def search(self, query, top_k):
+        """Queue one query and block until its results are ready."""
+        future = Future()
+        self._queue.put((query, top_k, future))
+        return future.result()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                # One query call for the whole batch, at the largest requested depth
+                depth = max(top_k for _, top_k, _ in batch)
+                results = self.pipeline.search_many([query for query, _, _ in batch], depth)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, top_k, future), result in zip(batch, results):
+                future.set_result(truncate_results(result, top_k))
+
+
+def make_handler(batcher):
+    """Build the request handler class bound to a batcher."""
+
+    class RAGRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive for RAGClient's persistent connection
+        disable_nagle_algorithm = True  # headers and body go out as separate small writes
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"status": "ok"})
+            elif self.path == "/stats":
+                self._reply(200, batcher.pipeline.stats())
+            else:
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/search":
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                query = request["query"]
+                top_k = int(request.get("top_k", 3))
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(400, {"error": f"Bad request: {e}"})
+                return
+
+            try:
+                results = batcher.search(query, top_k)
+            except Exception as e:
+                self._reply(500, {"error": str(e)})
+                return
+
+            payload = {"results": results}
+            if request.get("context"):
+                payload["context"] = format_context(results)
+            self._reply(200, payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return RAGRequestHandler
+
+
+def serve(host=HOST, port=PORT, chroma_path=CHROMA_PATH, model_path=MODEL_PATH, backend="chroma", hybrid=True):
+    """Load the pipeline once and serve searches until interrupted."""
+    pipeline = RAGPipeline(chroma_path=chroma_path, model_path=model_path, backend=backend, hybrid=hybrid)
+    server = ThreadingHTTPServer((host, port), make_handler(QueryBatcher(pipeline)))
+    server.daemon_threads = True
+    print(f"[RAG] Service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class RAGClient:
+    """
+    Drop-in replacement for RAGPipeline.search()/format_context() backed by the service.
+
+    If the service cannot be reached and fallback is enabled, a local
+    RAGPipeline is loaded once and used instead.
+    """
+
+    def __init__(self, host=HOST, port=PORT, timeout=CLIENT_TIMEOUT, fallback=True,
+                 chroma_path=CHROMA_PATH, model_path=MODEL_PATH):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.fallback = fallback
+        self.chroma_path = chroma_path
+        self.model_path = model_path
+        self._conn = None
+        self._local = None
+        self._lock = threading.Lock()
+
+    def _post(self, path, payload):
+        body = json.dumps(payload).encode("utf-8")
+        for attempt in range(2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+                response = self._conn.getresponse()
+                data = json.loads(response.read())
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # Stale keep-alive connection: reconnect once
+                self._conn.close()
+                self._conn = None
+                if attempt:
+                    raise
+                continue
+            except Exception:
+                self._conn.close()
+                self._conn = None
+                raise
+            if response.status != 200:
+                raise RuntimeError(f"RAG service error {response.status}: {data.get('error')}")
+            return data
+
+    def _local_pipeline(self):
+        if self._local is None:
+            print("[RAG] Service unavailable, loading the pipeline locally...")
+            self._local = RAGPipeline(chroma_path=self.chroma_path, model_path=self.model_path)
+        return self._local
+
+    def search(self, query, top_k=3):
+        """Return the nearest documents for a query, shaped like RAGPipeline.search()."""
+        with self._lock:
+            if self._local is None:
+                try:
+                    return self._post("/search", {"query": query, "top_k": top_k})["results"]
+                except OSError:
+                    if not self.fallback:
+                        raise
+            return self._local_pipeline().search(query, top_k)
+
+    def format_context(self, results):
+        return format_context(results)
+
+    def stats(self):
+        """Cache and latency statistics of whichever pipeline answers the searches."""
+        with self._lock:
+            if self._local is not None:
+                return self._local.stats()
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            try:
+                self._conn.request("GET", "/stats")
+                return json.loads(self._conn.getresponse().read())
+            except Exception:
+                self._conn.close()
+                self._conn = None
+                raise
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve RAG searches from a warm pipeline.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--chroma-path", default=CHROMA_PATH)
+    parser.add_argument("--model-path", default=MODEL_PATH)
+    parser.add_argument("--backend", choices=BACKENDS, default="chroma",
+                        help="Retrieval backend: ChromaDB or the brute-force NumPy index")
+    parser.add_argument("--no-hybrid", action="store_true", help="Search embeddings only, without BM25 fusion")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.chroma_path, args.model_path, args.backend, hybrid=not args.no_hybrid)
+
+
+if __name__ == "__main__":
+    main()
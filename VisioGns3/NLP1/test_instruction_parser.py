@@ -0,0 +1,38 @@
+"""Regression tests for the rule-based instruction parser."""
+
+import pytest
+
+from instruction_parser import CONFIDENCE_THRESHOLD, parse_instruction
+
+
+@pytest.mark.parametrize("text, topology, machine_count, link_count", [
+    ("Ring topology with 5 routers", "ring", 5, 5),
+    ("Star topology with router 1 connected to 8 pcs", "star", 9, 8),
+    ("Full mesh of 4 routers", "mesh", 4, 6),
+])
+def test_templated_instructions_are_accepted(text, topology, machine_count, link_count):
+    parsed = parse_instruction(text)
+    assert parsed.topology == topology
+    assert len(parsed.machines) == machine_count
+    assert len(parsed.connections) == link_count
+    assert parsed.confidence >= CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("text", [
+    # device types the builder leaves out
+    "Build a ring of 4 routers and connect router 1 to the internet",
+    "Ring topology with 4 routers with a server attached to each router",
+    "Ring topology with 4 routers and a cloud",
+    "Daisy chain of 4 switches with a laptop on the end",
+    # exclusions
+    "full mesh of 4 routers with no link between router 1 and router 2",
+    "Ring topology with 5 routers without router 3",
+    "Star topology with router 1 connected to 8 pcs except pc 4",
+    "Full mesh of 4 routers but router 1 should not connect to router 4",
+    # too large for the rules
+    "Full mesh of 3000 routers",
+    "Cascade of 20 switches each with 20 pcs",
+])
+def test_instructions_the_rules_cannot_express_go_to_the_model(text):
+    parsed = parse_instruction(text)
+    assert parsed is None or parsed.confidence < CONFIDENCE_THRESHOLD
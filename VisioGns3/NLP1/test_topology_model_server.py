@@ -0,0 +1,99 @@
+"""Tests for the batched decode loop of the model server, run against a scripted fake model."""
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from topology_model_server import GenerationBatcher, GenerationRequest, select_batch_rows
+
+EOS = 0
+HEADS = 2
+PROMPT_LENGTH = 3
+
+
+class FakeTokenizer:
+    eos_token_id = EOS
+
+    def __call__(self, prompts, return_tensors=None, padding=False):
+        shape = (len(prompts), PROMPT_LENGTH)
+        return {"input_ids": torch.ones(shape, dtype=torch.long),
+                "attention_mask": torch.ones(shape, dtype=torch.long)}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(str(i) for i in ids)
+
+
+class FakeOutput:
+    def __init__(self, logits, past_key_values):
+        self.logits = logits
+        self.past_key_values = past_key_values
+
+
+class FakeModel:
+    """
+    Emits scripts[row][step] for every row. The row a sequence started in is
+    stored in its (Bloom-style, heads folded into the batch) KV cache, so a
+    cache that is pruned wrongly produces the wrong tokens.
+    """
+
+    def __init__(self, scripts, vocab_size=10):
+        self.scripts = scripts
+        self.vocab_size = vocab_size
+        self.step = 0
+        self.batch_sizes = []
+
+    def __call__(self, input_ids, attention_mask, past_key_values=None, use_cache=True):
+        batch = input_ids.shape[0]
+        assert attention_mask.shape[0] == batch
+        if past_key_values is None:
+            rows = torch.arange(batch, dtype=torch.float32).repeat_interleave(HEADS)
+            key = rows.view(-1, 1, 1).expand(-1, 1, input_ids.shape[1]).clone()
+        else:
+            (key, _), = past_key_values
+            assert key.shape[0] == batch * HEADS
+            assert attention_mask.shape[1] == key.shape[-1] + input_ids.shape[1]
+            key = torch.cat([key, key[:, :, -1:]], dim=-1)
+        value = key.transpose(1, 2).clone()
+
+        logits = torch.zeros(batch, input_ids.shape[1], self.vocab_size)
+        for b in range(batch):
+            script = self.scripts[int(key[b * HEADS, 0, 0])]
+            logits[b, -1, script[min(self.step, len(script) - 1)]] = 1.0
+        self.step += 1
+        self.batch_sizes.append(batch)
+        return FakeOutput(logits, ((key, value),))
+
+
+def decode(scripts, requests):
+    model = FakeModel(scripts)
+    batcher = GenerationBatcher(FakeTokenizer(), model)
+    batcher._generate(requests)
+    return model
+
+
+def test_finished_sequences_leave_the_batch():
+    short, long = GenerationRequest("a", 8), GenerationRequest("b", 4)
+    model = decode({0: [5, 6, EOS], 1: [7, 8, 9, 4, 3]}, [short, long])
+
+    assert short.text == "56"
+    assert long.text == "7894"  # stopped by max_new_tokens
+    assert model.batch_sizes == [2, 2, 2, 1]
+
+
+def test_cancelled_sequences_leave_the_batch():
+    kept, cancelled = GenerationRequest("a", 8), GenerationRequest("b", 8)
+    cancelled.cancelled = True
+    model = decode({0: [5, 6, EOS], 1: [7, 8, 9, EOS]}, [kept, cancelled])
+
+    assert kept.text == "56"
+    assert cancelled.text == ""
+    assert model.batch_sizes == [2, 1, 1]
+
+
+def test_select_batch_rows_keeps_whole_rows_of_a_legacy_cache():
+    key = torch.arange(3 * HEADS, dtype=torch.float32).view(-1, 1, 1)
+    past = ((key, key.clone()),)
+
+    (selected, _), = select_batch_rows(past, torch.tensor([0, 2]), 3)
+
+    assert selected.flatten().tolist() == [0, 1, 4, 5]
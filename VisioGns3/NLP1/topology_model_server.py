@@ -0,0 +1,504 @@
+"""
+Local CPU inference service for the fine-tuned topology model.
+
+trained_topology_model/ holds a LoRA adapter for bigscience/bloom-560m. The
+adapter is merged into the base weights once at load time (no LoRA
+matmuls per token), optionally int8 dynamically quantized, and kept
+resident. Prompts are answered over localhost HTTP:
+
+    POST /generate  {"prompt": "...", "max_new_tokens": 256, "stream": true, "constrained": true}
+                    streamed as newline-delimited JSON: {"token": "..."} per
+                    step, then {"done": true, "text": "...", ...}
+    GET  /stats     batch sizes and throughput
+    GET  /health
+
+Requests arriving together are decoded as one batch: the batcher thread
+waits a few milliseconds for more prompts, left-pads them and runs a
+greedy decode loop with a shared KV cache, streaming each sequence's new
+text as it is produced. A sequence that finishes, or whose client
+disconnects, is dropped from the batch and its KV cache at the next step.
+Requests that arrive mid-batch start with the next batch.
+
+By default the output is constrained to the training JSON schema
+(constrained_decoding.py): disallowed tokens are masked before each pick and
+a sequence ends as soon as its JSON object closes. Send "constrained": false
+for free-form text.
+
+Run with:  python topology_model_server.py [--quantize] [--port 8766]
+"""
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import select
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from constrained_decoding import TokenConstraint
+
+# ---------------- CONFIG ---------------- #
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ADAPTER_DIR = os.path.join(BASE_DIR, "trained_topology_model")
+
+# Must match the format the adapter was fine-tuned on (prompt/response
+# pairs from prepare_training_data.py)
+PROMPT_TEMPLATE = "### Instruction:\n{prompt}\n\n### Response:\n"
+
+HOST = "127.0.0.1"
+PORT = 8766
+BATCH_WINDOW = 0.01    # seconds to wait for more prompts once one arrives
+MAX_BATCH = 8
+MAX_NEW_TOKENS = 512
+CLIENT_TIMEOUT = 120.0  # seconds
+DISCONNECT_POLL = 0.5   # seconds between client liveness checks while a non-streamed reply is generated
+
+
+# ---------------- MODEL ---------------- #
+def base_model_name(adapter_dir):
+    """Base model the adapter was trained on, from its adapter_config.json."""
+    with open(os.path.join(adapter_dir, "adapter_config.json"), "r", encoding="utf-8") as f:
+        return json.load(f)["base_model_name_or_path"]
+
+
+def load_model(adapter_dir=ADAPTER_DIR, base_model=None, quantize=False, threads=None):
+    """
+    Load the base model, merge the LoRA adapter into it and prepare it for CPU inference.
+
+    :param quantize: apply int8 dynamic quantization to every nn.Linear
+    :param threads: torch intra-op thread count (default: torch's choice)
+    :return: (tokenizer, model)
+    """
+    import torch
+    from peft import PeftModel
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    base_model = base_model or base_model_name(adapter_dir)
+    print(f"[LLM] Loading {base_model} with adapter {adapter_dir}...")
+    tokenizer = AutoTokenizer.from_pretrained(base_model, padding_side="left")
+    tokenizer.pad_token = tokenizer.eos_token  # as in the adapter's special_tokens_map.json
+
+    model = AutoModelForCausalLM.from_pretrained(base_model, torch_dtype=torch.float32)
+    model = PeftModel.from_pretrained(model, adapter_dir)
+    model = model.merge_and_unload()
+    model.eval()
+
+    if quantize:
+        print("[LLM] Quantizing linear layers to int8...")
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    return tokenizer, model
+
+
+# ---------------- BATCHED GENERATION ---------------- #
+class GenerationRequest:
+    """One prompt being decoded; new text is pushed to its queue, None marks the end."""
+
+    def __init__(self, prompt, max_new_tokens, constrained=False):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.constrained = constrained
+        self.grammar_state = None
+        self.stream = queue.Queue()
+        self.token_ids = []
+        self.pending_ids = []  # tokens not yet decoded, e.g. the first bytes of a multi-byte character
+        self.text = ""
+        self.cancelled = False
+        self.error = None
+
+    def tokens(self, client_gone=None, interval=DISCONNECT_POLL):
+        """
+        Yield new text as it is generated; raises if generation failed.
+
+        :param client_gone: checked every interval seconds while no text arrives;
+            once it returns True the request is cancelled and no more text is yielded
+        """
+        while True:
+            try:
+                piece = self.stream.get(timeout=interval if client_gone else None)
+            except queue.Empty:
+                if client_gone():
+                    self.cancelled = True
+                    return
+                continue
+            if piece is None:
+                break
+            yield piece
+        if self.error is not None:
+            raise self.error
+
+
+def select_batch_rows(past, index, batch_size):
+    """Keep only the given batch rows of a KV cache, either a transformers Cache or the legacy tuples."""
+    if hasattr(past, "batch_select_indices"):
+        past.batch_select_indices(index)
+        return past
+
+    def select(tensor):
+        # Bloom's legacy cache folds the attention heads into the batch dimension
+        rows = tensor.reshape(batch_size, -1, *tensor.shape[1:])
+        return rows[index].reshape(-1, *tensor.shape[1:])
+
+    return tuple(tuple(select(tensor) for tensor in layer) for layer in past)
+
+
+class GenerationBatcher:
+    """Collects concurrent prompts and decodes them together on one background thread."""
+
+    def __init__(self, tokenizer, model, window=BATCH_WINDOW, max_batch=MAX_BATCH,
+                 prompt_template=PROMPT_TEMPLATE, constraint=None):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.constraint = constraint
+        self.window = window
+        self.max_batch = max_batch
+        self.prompt_template = prompt_template
+        self.requests = 0
+        self.batches = 0
+        self.generated_tokens = 0
+        self.busy_seconds = 0.0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="llm-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt, max_new_tokens=MAX_NEW_TOKENS, constrained=True):
+        """Queue a prompt and return its GenerationRequest; constrained needs a TokenConstraint."""
+        request = GenerationRequest(prompt, max_new_tokens, constrained and self.constraint is not None)
+        self._queue.put(request)
+        return request
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [r for r in self._collect() if not r.cancelled]
+            if not batch:
+                continue
+            start = time.perf_counter()
+            try:
+                self._generate(batch)
+            except Exception as e:
+                for request in batch:
+                    request.error = e
+            finally:
+                for request in batch:
+                    request.stream.put(None)
+            self.requests += len(batch)
+            self.batches += 1
+            self.busy_seconds += time.perf_counter() - start
+
+    def _emit(self, request, token_id):
+        """Append a token to a request and stream whatever text it completes, decoding only the new tokens."""
+        request.token_ids.append(token_id)
+        request.pending_ids.append(token_id)
+        piece = self.tokenizer.decode(request.pending_ids, skip_special_tokens=True)
+        if piece.endswith("\ufffd"):
+            return  # partial multi-byte character, wait for the next token
+        request.pending_ids = []
+        if piece:
+            request.stream.put(piece)
+            request.text += piece
+
+    def _generate(self, batch):
+        """Greedy decode a batch of left-padded prompts, one forward pass per step for all of them."""
+        import torch
+
+        prompts = [self.prompt_template.format(prompt=r.prompt) for r in batch]
+        encoded = self.tokenizer(prompts, return_tensors="pt", padding=True)
+        input_ids = encoded["input_ids"]
+        attention_mask = encoded["attention_mask"]
+        eos_id = self.tokenizer.eos_token_id
+        constraint = self.constraint
+        for request in batch:
+            if request.constrained:
+                request.grammar_state = constraint.grammar.start
+
+        active = list(batch)
+        past = None
+        with torch.inference_mode():
+            for step in range(max(r.max_new_tokens for r in batch)):
+                out = self.model(input_ids=input_ids, attention_mask=attention_mask,
+                                 past_key_values=past, use_cache=True)
+                past = out.past_key_values
+                logits = out.logits[:, -1, :]
+                finished = [False] * len(active)
+
+                # Only tokens that keep the output valid under the schema can win
+                for i, request in enumerate(active):
+                    if request.grammar_state is not None:
+                        allowed = constraint.allowed(request.grammar_state)
+                        if len(allowed) == 0:
+                            finished[i] = True
+                            continue
+                        masked = torch.full_like(logits[i], float("-inf"))
+                        masked[allowed] = logits[i][allowed]
+                        logits[i] = masked
+                next_ids = logits.argmax(dim=-1)
+
+                for i, request in enumerate(active):
+                    if finished[i]:
+                        continue
+                    token_id = int(next_ids[i])
+                    if token_id == eos_id or request.cancelled:
+                        finished[i] = True
+                        continue
+                    self._emit(request, token_id)
+                    self.generated_tokens += 1
+                    if request.grammar_state is not None:
+                        request.grammar_state = constraint.grammar.advance(request.grammar_state,
+                                                                           constraint.text(token_id))
+                        if constraint.grammar.is_done(request.grammar_state):
+                            finished[i] = True  # the JSON object is closed
+                    if len(request.token_ids) >= request.max_new_tokens:
+                        finished[i] = True
+
+                keep = [i for i, done in enumerate(finished) if not done]
+                if not keep:
+                    break
+                input_ids = next_ids.unsqueeze(-1)
+                if len(keep) < len(active):
+                    # Finished and cancelled sequences leave the batch and the KV cache,
+                    # so the remaining ones stop paying for them
+                    index = torch.tensor(keep)
+                    input_ids, attention_mask = input_ids[index], attention_mask[index]
+                    past = select_batch_rows(past, index, len(active))
+                    active = [active[i] for i in keep]
+                attention_mask = torch.cat([attention_mask, attention_mask.new_ones((len(active), 1))], dim=-1)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+            "generated_tokens": self.generated_tokens,
+            "tokens_per_second": self.generated_tokens / self.busy_seconds if self.busy_seconds else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+
+# ---------------- HTTP SERVICE ---------------- #
+def make_handler(batcher):
+    """Build the request handler class bound to a batcher."""
+
+    class GenerationRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # streamed tokens are small writes
+
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _client_gone(self):
+            """True once the client has closed its end of the connection."""
+            try:
+                readable, _, _ = select.select([self.connection], [], [], 0)
+                return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+            except OSError:
+                return True
+
+        def _write_chunk(self, payload):
+            data = (json.dumps(payload) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"status": "ok"})
+            elif self.path == "/stats":
+                self._reply(200, batcher.stats())
+            else:
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/generate":
+                self._reply(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                prompt = body["prompt"]
+                max_new_tokens = min(int(body.get("max_new_tokens", MAX_NEW_TOKENS)), MAX_NEW_TOKENS)
+                constrained = bool(body.get("constrained", True))
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(400, {"error": f"Bad request: {e}"})
+                return
+
+            start = time.perf_counter()
+            request = batcher.submit(prompt, max_new_tokens, constrained)
+
+            if not body.get("stream"):
+                # Nothing is written until the end, so a client that gave up is
+                # noticed by watching its socket instead of by a failed write
+                try:
+                    for _ in request.tokens(client_gone=self._client_gone):
+                        pass
+                except Exception as e:
+                    self._reply(500, {"error": str(e)})
+                    return
+                if request.cancelled:
+                    self.close_connection = True
+                    return
+                try:
+                    self._reply(200, {"text": request.text, "tokens": len(request.token_ids),
+                                      "seconds": time.perf_counter() - start})
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                try:
+                    for piece in request.tokens():
+                        self._write_chunk({"token": piece})
+                    self._write_chunk({"done": True, "text": request.text, "tokens": len(request.token_ids),
+                                       "seconds": time.perf_counter() - start})
+                except (BrokenPipeError, ConnectionResetError):
+                    request.cancelled = True  # client went away: free its batch slot
+                    return
+                except Exception as e:
+                    self._write_chunk({"error": str(e)})
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                request.cancelled = True
+
+        def log_message(self, format, *args):
+            pass
+
+    return GenerationRequestHandler
+
+
+def serve(host=HOST, port=PORT, adapter_dir=ADAPTER_DIR, base_model=None, quantize=False, threads=None,
+          max_batch=MAX_BATCH, prompt_template=PROMPT_TEMPLATE, constrained=True):
+    """Load the model once and serve generations until interrupted."""
+    start = time.perf_counter()
+    tokenizer, model = load_model(adapter_dir, base_model, quantize, threads)
+    constraint = None
+    if constrained:
+        print("[LLM] Indexing the vocabulary for constrained decoding...")
+        constraint = TokenConstraint(tokenizer)
+    print(f"[LLM] Model ready in {time.perf_counter() - start:.1f}s")
+
+    batcher = GenerationBatcher(tokenizer, model, max_batch=max_batch, prompt_template=prompt_template,
+                                constraint=constraint)
+    server = ThreadingHTTPServer((host, port), make_handler(batcher))
+    server.daemon_threads = True
+    print(f"[LLM] Service listening on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# ---------------- CLIENT ---------------- #
+class TopologyModelClient:
+    """Talks to the running service; one connection per call so streams can run concurrently."""
+
+    def __init__(self, host=HOST, port=PORT, timeout=CLIENT_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+    def _open(self, method, path, payload=None):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+        return conn, conn.getresponse()
+
+    def stream(self, prompt, max_new_tokens=MAX_NEW_TOKENS, constrained=True):
+        """Yield generated text pieces as the model produces them."""
+        conn, response = self._open("POST", "/generate", {"prompt": prompt, "max_new_tokens": max_new_tokens,
+                                                          "stream": True, "constrained": constrained})
+        try:
+            if response.status != 200:
+                raise RuntimeError(f"Model service error {response.status}: "
+                                   f"{json.loads(response.read()).get('error')}")
+            for line in response:
+                message = json.loads(line)
+                if "error" in message:
+                    raise RuntimeError(f"Model service error: {message['error']}")
+                if message.get("done"):
+                    break
+                yield message["token"]
+        finally:
+            conn.close()
+
+    def generate(self, prompt, max_new_tokens=MAX_NEW_TOKENS, constrained=True):
+        """Return the full completion for a prompt."""
+        conn, response = self._open("POST", "/generate", {"prompt": prompt, "max_new_tokens": max_new_tokens,
+                                                          "constrained": constrained})
+        try:
+            data = json.loads(response.read())
+        finally:
+            conn.close()
+        if response.status != 200:
+            raise RuntimeError(f"Model service error {response.status}: {data.get('error')}")
+        return data["text"]
+
+    def generate_topology(self, prompt, max_new_tokens=MAX_NEW_TOKENS):
+        """Return the {"machines": [...], "connections": [...]} dict generated for a prompt."""
+        text = self.generate(prompt, max_new_tokens, constrained=True)
+        try:
+            return json.loads(text)
+        except ValueError as e:
+            raise RuntimeError(f"Model output is not complete JSON (max_new_tokens={max_new_tokens}): {e}")
+
+    def available(self):
+        """True if the service answers its health check."""
+        try:
+            conn, response = self._open("GET", "/health")
+            conn.close()
+            return response.status == 200
+        except OSError:
+            return False
+
+    def stats(self):
+        conn, response = self._open("GET", "/stats")
+        try:
+            return json.loads(response.read())
+        finally:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the fine-tuned topology model on CPU.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--adapter-dir", default=ADAPTER_DIR)
+    parser.add_argument("--base-model", default=None, help="Override the base model named in the adapter config")
+    parser.add_argument("--quantize", action="store_true", help="int8 dynamic quantization of linear layers")
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU threads")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--no-constraint", action="store_true", help="Disable schema-constrained decoding")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.adapter_dir, args.base_model, args.quantize, args.threads, args.max_batch,
+          constrained=not args.no_constraint)
+
+
+if __name__ == "__main__":
+    main()
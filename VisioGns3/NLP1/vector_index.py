@@ -0,0 +1,143 @@
+"""
+Brute-force in-process vector index for small corpora.
+
+The knowledge base is only a few hundred chunks, so an exact search over
+all of them is one matrix-vector product. Embeddings are stored L2-normalised
+in a float32 .npy file that is memory-mapped on load; ids, documents and
+metadata live in a JSON file beside it. NumpyVectorIndex.query() takes the same
+arguments as a ChromaDB collection's and returns the same result shape, so
+RAGPipeline can use either backend.
+
+Every build writes its files into a fresh version directory and then points
+the manifest at it with a single os.replace, so a reader always loads files
+from one and the same build.
+"""
+
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+EMBEDDINGS_FILE = "embeddings.npy"
+RECORDS_FILE = "records.json"
+# Names the version directory holding the current build
+MANIFEST_FILE = "current.json"
+VERSION_PREFIX = "v"
+
+
+def current_index_dir(index_dir):
+    """Directory holding the current build of an index, or None if none was published."""
+    try:
+        with open(os.path.join(index_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            version = json.load(f)["version"]
+    except FileNotFoundError:
+        return None
+    return os.path.join(index_dir, version)
+
+
+def publish_index_version(index_dir, write_files):
+    """
+    Build an index into a new version directory and switch readers over to it.
+
+    write_files(version_dir) writes all of the index files; the manifest is
+    replaced only after it returns, in one os.replace. The build replaced now
+    is kept for readers still loading it, older ones are removed.
+    """
+    os.makedirs(index_dir, exist_ok=True)
+    version = f"{VERSION_PREFIX}{time.time_ns()}"
+    version_dir = os.path.join(index_dir, version)
+    os.makedirs(version_dir)
+    try:
+        write_files(version_dir)
+    except BaseException:
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+
+    previous = current_index_dir(index_dir)
+    tmp_manifest = os.path.join(index_dir, MANIFEST_FILE + ".tmp")
+    with open(tmp_manifest, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "updated_at": time.time()}, f)
+    os.replace(tmp_manifest, os.path.join(index_dir, MANIFEST_FILE))
+
+    keep = {version_dir, previous}
+    for entry in os.scandir(index_dir):
+        if entry.is_dir() and entry.name.startswith(VERSION_PREFIX) and entry.path not in keep:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def normalize_rows(matrix):
+    """Scale every row to unit length (zero rows are left as they are)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class NumpyVectorIndex:
+    """Exact cosine-similarity index over a memory-mapped embedding matrix."""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        version_dir = current_index_dir(index_dir)
+        if version_dir is None:
+            raise FileNotFoundError(f"No vector index published in {index_dir}")
+        with open(os.path.join(version_dir, RECORDS_FILE), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        self.ids = records["ids"]
+        self.documents = records["documents"]
+        self.metadatas = records["metadatas"]
+        self.embeddings = np.load(os.path.join(version_dir, EMBEDDINGS_FILE), mmap_mode="r")
+
+    def count(self):
+        return len(self.ids)
+
+    def query(self, query_embeddings, n_results=10):
+        """
+        Return the n_results nearest records for each query embedding.
+
+        Distances are squared L2 between unit vectors (2 - 2 * cosine), the
+        same values ChromaDB's default "l2" space reports for normalised
+        embeddings.
+        """
+        queries = normalize_rows(np.atleast_2d(query_embeddings))
+        k = min(n_results, len(self.ids))
+        if k:
+            scores = queries @ self.embeddings.T  # (queries, records) cosine similarities
+        else:
+            scores = np.zeros((len(queries), 0), dtype=np.float32)
+
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": [],
+                  "embeddings": None, "uris": None, "data": None,
+                  "included": ["metadatas", "documents", "distances"]}
+        for row in scores:
+            if 0 < k < len(row):
+                top = np.argpartition(-row, k - 1)[:k]
+            else:
+                top = np.arange(len(row))
+            top = top[np.argsort(-row[top], kind="stable")]
+            result["ids"].append([self.ids[i] for i in top])
+            result["documents"].append([self.documents[i] for i in top])
+            result["metadatas"].append([self.metadatas[i] for i in top])
+            result["distances"].append([float(2.0 - 2.0 * row[i]) for i in top])
+        return result
+
+
+def build_index(index_dir, ids, embeddings, documents, metadatas):
+    """Write a NumpyVectorIndex as a new version of index_dir (see publish_index_version)."""
+    matrix = normalize_rows(embeddings) if len(ids) else np.zeros((0, 0), dtype=np.float32)
+
+    def write_files(version_dir):
+        np.save(os.path.join(version_dir, EMBEDDINGS_FILE), matrix)
+        with open(os.path.join(version_dir, RECORDS_FILE), "w", encoding="utf-8") as f:
+            json.dump({"ids": list(ids), "documents": list(documents), "metadatas": list(metadatas)}, f)
+
+    publish_index_version(index_dir, write_files)
+
+
+def export_collection(collection, index_dir):
+    """Copy a ChromaDB collection's stored embeddings into a NumpyVectorIndex (no re-embedding)."""
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    build_index(index_dir, data["ids"], data["embeddings"], data["documents"], data["metadatas"])
+    return len(data["ids"])
@@ -3,14 +3,19 @@ set -e  # Exit immediately if any command fails
 
 echo "🔄 Checking if GNS3 server is running..."
 
-# Check if GNS3 server is already running
-if ! pgrep -f "gns3server" > /dev/null; then
-    echo "🚀 Starting GNS3 server..."
-    gns3 &> /dev/null &  # Start GNS3 server in the background silently
-    sleep 5  # Wait for the server to initialize
-else
-    echo "✅ GNS3 server is already running."
-fi
+# Check if GNS3 server is already running; concurrent jobs take a lock so only one starts it
+(
+    flock 9
+    if ! pgrep -f "gns3server" > /dev/null; then
+        echo "🚀 Starting GNS3 server..."
+        # Start GNS3 server in the background silently, in its own session so
+        # cancelling the job (which signals the job's whole process group) leaves it running
+        setsid gns3 &> /dev/null 9>&- < /dev/null &
+        sleep 5  # Wait for the server to initialize
+    else
+        echo "✅ GNS3 server is already running."
+    fi
+) 9>"/tmp/visio-gns3-server-start.lock"
 
 # Set working directory
 BASE_DIR=~/INDA/VisioGns3
@@ -18,93 +23,20 @@ UPLOADS_DIR="$BASE_DIR/uploads"
 
 cd "$BASE_DIR" || exit
 
-echo "➡️ Running retrieve_detail.py"
-python3 retrieve_detail.py
-# Get the most recent file in uploads
-LATEST_FILE=$(ls -t "$UPLOADS_DIR" | head -n 1)
-EXT="${LATEST_FILE##*.}"
+# A job passes its own copy of the diagram; otherwise use the most recent file in uploads
+if [ -f "${1:-}" ]; then
+    UPLOAD_PATH="$1"
+    shift
+else
+    UPLOAD_PATH="$UPLOADS_DIR/$(ls -t "$UPLOADS_DIR" | head -n 1)"
+fi
+FILE_NAME=$(basename "$UPLOAD_PATH")
+EXT="${FILE_NAME##*.}"
 
-echo "📂 Latest file detected: $LATEST_FILE"
+echo "📂 File: $UPLOAD_PATH"
 echo "📑 File extension: $EXT"
 
-case "$EXT" in
-  vsdx)
-    echo "🖼 Processing VSDX file..."
-    cd "$BASE_DIR/vsdx"
-
-    echo "➡️ Running extract_vsdx.py"
-    python3 extract_vsdx.py
-
-    echo "➡️ Running machine_info.py"
-    python3 machine_info.py
-
-    echo "➡️ Generating Machines YAML"
-    python3 generate_machines_yaml.py
-
-    echo "➡️ Running ListConnections.py"
-    python3 ListConnections.py
-
-    echo "➡️ Running addportnumbers.py"
-    python3 addportnumbers.py
-
-    echo "➡️ Running generatePlaybook.py"
-    python3 generate_connections_yaml.py
-    ;;
-  
-  xml)
-    echo "🖼 Processing XML file..."
-    cd "$BASE_DIR/xml"
-
-    echo "➡️ Running extract_xml.py"
-    python3 extract_xml.py
-
-    echo "➡️ Generating Machines YAML"
-    python3 generate_machines_yaml_xml.py
-
-    echo "➡️ Running ListConnections.py"
-    python3 ListConnections_xml.py
-
-    echo "➡️ Running generatePlaybook.py"
-    python3 generate_connections_yaml_xml.py
-
-    # Add extra XML-specific steps here
-    echo "⚠️ XML pipeline not fully implemented yet"
-    ;;
-
-  svg)
-    echo "🖼 Processing SVG file..."
-    cd "$BASE_DIR/svg"
-
-    echo "➡️ Running extract_svg.py"
-    python3 extract_svg.py
-
-    echo "➡️ Generating Machines YAML"
-    python3 generate_machines_yaml_svg.py
-
-    echo "➡️ Running ListConnections.py"
-    python3 ListConnections_svg.py
-
-    echo "➡️ Running generatePlaybook.py"
-    python3 generate_connections_yaml_svg.py
-
-    # Add extra XML-specific steps here
-    echo "⚠️ XML pipeline not fully implemented yet"
-    ;;
-
-  *)
-    echo "❌ Unsupported file type: $EXT"
-    exit 1
-    ;;
-esac
-
-# Run ansible playbooks from Main_playbooks
-cd "$BASE_DIR/Main_playbooks"
-echo "▶️ Running Playbooks..."
-
-echo "➡️ Running Gns3_Machines.yaml"
-ansible-playbook Gns3_Machines.yaml
-
-echo "➡️ Running Gns3_Connections.yaml"
-ansible-playbook Gns3_Connections.yaml
-
-echo "✅ Completed successfully"
\ No newline at end of file
+# Every stage (server details, parsing, playbook generation and deployment)
+# runs inside one Python process; pass --debug-files to also write Generated_files/
+echo "➡️ Running pipeline.py"
+python3 -u pipeline.py "$UPLOAD_PATH" "$@"
@@ -0,0 +1,224 @@
+"""
+batch_convert.py
+
+Converts whole directories of diagrams without the GUI.
+
+Every .vsdx, .xml and .svg file found under the given directories or globs
+is parsed in a pool of worker processes, using the same parsers and parse
+cache as pipeline.py. Each diagram gets its own output directory holding its
+machine list and connections (and, with --playbooks, its Ansible playbooks),
+and a throughput summary per format is printed at the end.
+
+Example:
+    python3 batch_convert.py ../topologies --output-dir converted/
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pipeline
+import parse_cache
+import retrieve_detail
+
+DEFAULT_OUTPUT_DIR = os.path.join(pipeline.BASE_DIR, "converted")
+
+
+def glob_root(pattern):
+    """Directory part of a glob pattern before its first wildcard."""
+    parts = []
+    for part in pattern.split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.sep.join(parts) or "."
+
+
+def collect_diagrams(inputs):
+    """
+    Expand directories (recursively), globs and plain paths into the supported diagrams they contain.
+
+    Each diagram is named by its path relative to the directory or glob it
+    was found under, so lab diagrams in different subdirectories keep apart.
+
+    :return: Sorted list of (path, format, relative name) with duplicate paths removed.
+    """
+    relative = {}  # absolute path -> name relative to its input root
+    for item in inputs:
+        if os.path.isdir(item):
+            found = [(os.path.join(root, name), item) for root, _, files in os.walk(item) for name in files]
+        elif glob.has_magic(item):
+            found = [(path, glob_root(item)) for path in glob.glob(item, recursive=True) if os.path.isfile(path)]
+        elif os.path.isfile(item):
+            found = [(item, os.path.dirname(item) or ".")]
+        else:
+            raise FileNotFoundError(f"No such file or directory: {item}")
+        for path, root in found:
+            relative.setdefault(os.path.abspath(path), os.path.relpath(path, root))
+
+    diagrams = []
+    for path in sorted(relative):
+        ext = path.rsplit(".", 1)[-1].lower()
+        if ext in pipeline.FORMATS:
+            diagrams.append((path, ext, relative[path]))
+    return diagrams
+
+
+def assign_output_dirs(diagrams, output_dir):
+    """
+    Map each diagram path to its own output directory, <relative dir>/<stem>-<format>.
+
+    The format suffix keeps d1.drawio.xml and d1.drawio.svg apart; diagrams
+    that still collide (the same relative path under two inputs) get -2, -3, ...
+    """
+    taken = set()
+    output_dirs = {}
+    for path, fmt, name in diagrams:
+        base = os.path.join(output_dir, os.path.dirname(name), f"{os.path.splitext(os.path.basename(name))[0]}-{fmt}")
+        candidate, n = base, 1
+        while candidate in taken:
+            n += 1
+            candidate = f"{base}-{n}"
+        taken.add(candidate)
+        output_dirs[path] = candidate
+    return output_dirs
+
+
+def convert_diagram(upload_path, fmt, diagram_dir, cache_path=parse_cache.DEFAULT_CACHE_PATH, server=None, verbose=False):
+    """
+    Parse one diagram and write its outputs into diagram_dir. Runs in a worker process.
+
+    :param server: (ip, port, templates) to also write the Ansible playbooks, or None.
+    :param verbose: Let the parsers' progress output through instead of discarding it.
+    :return: Dictionary with the path, format, counts, elapsed seconds and error message (None on success).
+    """
+    start = time.perf_counter()
+    result = {"path": upload_path, "format": fmt, "machines": 0, "links": 0, "error": None}
+    try:
+        with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+            topology = pipeline.parse_upload(upload_path, fmt, cache_path)
+
+        os.makedirs(diagram_dir, exist_ok=True)
+        with open(os.path.join(diagram_dir, "machine_names.txt"), "w") as f:
+            for name in topology.machine_names:
+                f.write(name + "\n")
+        with open(os.path.join(diagram_dir, "Connections.json"), "w") as f:
+            json.dump(topology.connections, f, indent=4)
+
+        if server is not None:
+            ip, port, templates = server
+            _, machines_module, connections_module = pipeline.FORMATS[fmt]
+            project_name = machines_module.get_project_name_from_vsdx(upload_path)
+            with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+                pipeline.write_playbooks(diagram_dir, ip, port, topology, templates, project_name,
+                                         machines_module, connections_module)
+
+        result["machines"] = len(topology.machine_names)
+        result["links"] = topology.link_count
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def convert_all(diagrams, output_dir, workers=None, cache_path=parse_cache.DEFAULT_CACHE_PATH, server=None,
+                verbose=False):
+    """
+    Convert diagrams in a process pool, printing one line per finished diagram.
+
+    Diagrams are submitted grouped by format, largest format group first, so
+    the slow .vsdx archives start early instead of trailing at the end.
+
+    :return: List of the per-diagram results from convert_diagram, in completion order.
+    """
+    output_dirs = assign_output_dirs(diagrams, output_dir)
+    names = {path: name for path, _, name in diagrams}
+    by_format = {}
+    for path, fmt, _ in diagrams:
+        by_format.setdefault(fmt, []).append(path)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(convert_diagram, path, fmt, output_dirs[path], cache_path, server, verbose)
+                   for fmt in sorted(by_format, key=lambda fmt: (fmt != "vsdx", -len(by_format[fmt])))
+                   for path in by_format[fmt]]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            name = names[result["path"]]
+            if result["error"]:
+                print(f"❌ {name}: {result['error']}")
+            else:
+                target = os.path.relpath(output_dirs[result["path"]], output_dir)
+                print(f"✅ {name} → {target}: {result['machines']} machines, {result['links']} connections "
+                      f"({result['seconds']:.2f}s)")
+    return results
+
+
+def summarize(results, elapsed):
+    """Return the throughput summary lines, one per format and one for the whole batch."""
+    def line(label, rows, seconds):
+        ok = [row for row in rows if not row["error"]]
+        nodes = sum(row["machines"] for row in ok)
+        links = sum(row["links"] for row in ok)
+        rate = 1 / seconds if seconds > 0 else 0.0
+        return (f"{label:<6} {len(ok)}/{len(rows)} files, {nodes} nodes, {links} links, "
+                f"{len(ok) * rate:.1f} files/s, {nodes * rate:.1f} nodes/s")
+
+    lines = []
+    for fmt in sorted({row["format"] for row in results}):
+        rows = [row for row in results if row["format"] == fmt]
+        # Per-format rates use the time its diagrams spent in workers, the total uses wall-clock time
+        lines.append(line(fmt, rows, sum(row["seconds"] for row in rows)))
+    lines.append(line("total", results, elapsed))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert directories of diagrams headlessly in parallel.")
+    parser.add_argument("inputs", nargs="+", help="Directories, glob patterns or files (.vsdx, .xml, .svg)")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR, help="Directory receiving one subdirectory per diagram")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--no-cache", action="store_true", help="Always parse, bypassing the parse cache")
+    parser.add_argument("--playbooks", action="store_true",
+                        help="Also write the Ansible playbooks, using templates fetched once from the GNS3 server")
+    parser.add_argument("--verbose", action="store_true", help="Show the parsers' own progress output")
+    args = parser.parse_args()
+
+    try:
+        diagrams = collect_diagrams(args.inputs)
+    except FileNotFoundError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+    if not diagrams:
+        print("No .vsdx, .xml or .svg files found.")
+        sys.exit(1)
+
+    server = None
+    if args.playbooks:
+        ip, port = retrieve_detail.get_gns3_server_details(retrieve_detail.GNS3_CONF_PATH)
+        templates = retrieve_detail.format_templates(retrieve_detail.fetch_templates(ip, port))
+        server = (ip, port, templates)
+
+    print(f"📂 Converting {len(diagrams)} diagrams into {args.output_dir}")
+    start = time.perf_counter()
+    results = convert_all(diagrams, args.output_dir, args.workers,
+                          None if args.no_cache else parse_cache.DEFAULT_CACHE_PATH, server, args.verbose)
+    elapsed = time.perf_counter() - start
+
+    print(f"\nFinished in {elapsed:.2f}s")
+    for line in summarize(results, elapsed):
+        print(line)
+
+    if any(row["error"] for row in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
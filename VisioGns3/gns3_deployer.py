@@ -0,0 +1,354 @@
+"""
+gns3_deployer.py
+
+Deploys a parsed topology straight to the GNS3 v2 REST API.
+
+The generated Ansible playbooks run one `uri` task per node and per link, one
+after another, and every node POST repeats the whole template body. This
+deployer drives the API from asyncio instead: nodes are instantiated from
+their server-side template with only name/x/y in the body, requests share a
+pool of keep-alive HTTP connections, a semaphore caps how many are in flight,
+and failed calls are retried with exponential back-off when that is safe.
+"""
+
+import asyncio
+import http.client
+import json
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_IN_FLIGHT = 16
+RETRIES = 3
+BACKOFF = 0.5     # seconds, doubled after every failed attempt
+TIMEOUT = 30      # seconds per request
+LINK_BATCH_SIZE = 100
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+
+class GNS3Error(RuntimeError):
+    """Raised when the GNS3 server rejects a request or stays unreachable."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class NotSentError(OSError):
+    """The connection failed before any of the request was sent, so it is always safe to retry."""
+
+
+class GNS3Client:
+    """
+    Asyncio client for the GNS3 REST API.
+
+    Each request runs a blocking http.client call on a worker thread; the
+    connections are kept alive and handed back to a shared pool, so a deploy
+    only opens as many sockets as it has requests in flight.
+    """
+
+    def __init__(self, ip, port, max_in_flight=MAX_IN_FLIGHT, retries=RETRIES, timeout=TIMEOUT, backoff=BACKOFF):
+        self.host = ip
+        self.port = int(port)
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self._pool = queue.LifoQueue()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="gns3")
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Close every pooled connection and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    def _send(self, method, path, body):
+        """Perform one blocking request on a pooled connection."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+        if conn.sock is None:
+            try:
+                conn.connect()
+            except OSError as e:
+                conn.close()
+                raise NotSentError(e) from e
+
+        headers = {"Connection": "keep-alive"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            data = response.read()
+        except Exception:
+            conn.close()
+            raise
+
+        if response.will_close:
+            conn.close()
+        else:
+            self._pool.put(conn)
+
+        return response.status, json.loads(data) if data else None
+
+    async def request(self, method, path, body=None, expected=(200, 201)):
+        """
+        Send a JSON request and return the decoded response body.
+
+        Failures to connect are always retried. Idempotent methods are also
+        retried after any connection error and on 5xx responses; a POST only
+        on 503, since the server may already have created the project or node
+        and a retry would fail with 409 or add a renamed duplicate. Any other
+        unexpected status raises GNS3Error straight away.
+        """
+        idempotent = method in IDEMPOTENT_METHODS
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                try:
+                    status, data = await loop.run_in_executor(self._executor, self._send, method, path, body)
+                except NotSentError as e:
+                    error = GNS3Error(f"{method} {path} failed: {e}")
+                except (OSError, http.client.HTTPException) as e:
+                    error = GNS3Error(f"{method} {path} failed: {e}")
+                    if not idempotent:
+                        raise error
+                else:
+                    if status in expected:
+                        return data
+                    error = GNS3Error(f"{method} {path} returned {status}: {data}", status)
+                    if status < 500 or not (idempotent or status == 503):
+                        raise error
+
+                if attempt < self.retries:
+                    await asyncio.sleep(self.backoff * 2 ** attempt)
+
+        raise error
+
+
+def node_body(machine_name, template, x, y):
+    """Build the full node creation body the machines playbook sends for one device."""
+    body = {key: value for key, value in template.items() if key not in ("name", "x", "y")}
+    body.update({"name": machine_name, "x": x, "y": y})
+    return body
+
+
+def instantiate_body(machine_name, template, x, y):
+    """Build the template instantiation body: only the per-node overrides."""
+    return {"name": machine_name, "x": x, "y": y, "compute_id": template.get("compute_id", "local")}
+
+
+def node_request(project_id, machine_name, template, x, y):
+    """
+    Return the (path, body) creating one node.
+
+    Templates known to the server are instantiated by ID; anything else falls
+    back to posting the full node body.
+    """
+    template_id = template.get("template_id")
+    if template_id:
+        return f"/v2/projects/{project_id}/templates/{template_id}", instantiate_body(machine_name, template, x, y)
+    return f"/v2/projects/{project_id}/nodes", node_body(machine_name, template, x, y)
+
+
+def link_body(link, node_ids, endpoint_ports):
+    """Build the link creation body for one (from, to, from_adapter, to_adapter) link."""
+    start, end, from_adapter, to_adapter = link
+    nodes = []
+    for device, adapter in ((start, from_adapter), (end, to_adapter)):
+        adapter_number, port_number = endpoint_ports(device, adapter)
+        nodes.append({"node_id": node_ids[device], "adapter_number": adapter_number, "port_number": port_number})
+    return {"nodes": nodes}
+
+
+async def create_nodes(client, project_id, node_plan):
+    """
+    Create every planned node concurrently from its template.
+
+    :param node_plan: List of (machine_name, template, x, y) tuples.
+    :return: Dictionary mapping machine names to GNS3 node IDs.
+    """
+
+    async def create(machine_name, template, x, y):
+        path, body = node_request(project_id, machine_name, template, x, y)
+        node = await client.request("POST", path, body, expected=(201,))
+        return machine_name, node["node_id"]
+
+    results = await asyncio.gather(*(create(*node) for node in node_plan))
+    return dict(results)
+
+
+def missing_endpoints(links, node_names):
+    """Return the sorted link endpoints that have no entry in node_names."""
+    return sorted({device for link in links for device in link[:2] if device not in node_names})
+
+
+async def create_links(client, project_id, links, node_ids, endpoint_ports, batch_size=LINK_BATCH_SIZE):
+    """
+    Create links, batch_size concurrent requests at a time.
+
+    Every endpoint is checked against node_ids before the first link is sent,
+    so a topology with unknown devices fails up front instead of halfway.
+
+    :param links: List of (from, to, from_adapter, to_adapter) tuples.
+    """
+    missing = missing_endpoints(links, node_ids)
+    if missing:
+        raise GNS3Error(f"No node in the project for: {', '.join(missing)}")
+
+    path = f"/v2/projects/{project_id}/links"
+    for start in range(0, len(links), batch_size):
+        batch = links[start:start + batch_size]
+        await asyncio.gather(*(client.request("POST", path, link_body(link, node_ids, endpoint_ports), expected=(200, 201))
+                               for link in batch))
+    return len(links)
+
+
+def check_node_plan(node_plan, links):
+    """Refuse before creating anything if a link would point at a device that is not deployed."""
+    missing = missing_endpoints(links, {node[0] for node in node_plan})
+    if missing:
+        raise GNS3Error(f"Links reference devices without a node (missing template?): {', '.join(missing)}")
+
+
+def link_key(endpoints):
+    """Order-independent key of a link from its (node_id, adapter_number, port_number) endpoints."""
+    return tuple(sorted(endpoints))
+
+
+async def delete_all(client, paths):
+    """DELETE every path concurrently."""
+    await asyncio.gather(*(client.request("DELETE", path, expected=(200, 204)) for path in paths))
+
+
+async def create_project(client, project_name, node_plan, links, endpoint_ports):
+    """Create a new project with every planned node and link."""
+    project = await client.request("POST", "/v2/projects", {"name": project_name}, expected=(201,))
+    project_id = project["project_id"]
+    print(f"Created project {project_name} ({project_id})")
+
+    node_ids = await create_nodes(client, project_id, node_plan)
+    print(f"Created {len(node_ids)} nodes")
+
+    link_count = await create_links(client, project_id, links, node_ids, endpoint_ports)
+    print(f"Created {link_count} links")
+
+    return {"project_id": project_id, "node_ids": node_ids}
+
+
+async def deploy_async(ip, port, project_name, node_plan, topology, endpoint_ports, max_in_flight=MAX_IN_FLIGHT):
+    """
+    Create a project, its nodes and its links on the GNS3 server.
+
+    :param node_plan: List of (machine_name, template, x, y) tuples from plan_nodes().
+    :param topology: Parsed Topology with adapter numbers assigned.
+    :param endpoint_ports: Format specific (device, adapter_number) -> (adapter, port) mapping.
+    :return: Dictionary with the project ID and the name -> node ID map.
+    """
+    links = list(topology.links())
+    check_node_plan(node_plan, links)
+
+    async with GNS3Client(ip, port, max_in_flight=max_in_flight) as client:
+        return await create_project(client, project_name, node_plan, links, endpoint_ports)
+
+
+def deploy(ip, port, project_name, node_plan, topology, endpoint_ports, max_in_flight=MAX_IN_FLIGHT):
+    """Synchronous wrapper around deploy_async()."""
+    return asyncio.run(deploy_async(ip, port, project_name, node_plan, topology, endpoint_ports, max_in_flight))
+
+
+async def reconcile_async(ip, port, project_name, node_plan, topology, endpoint_ports, max_in_flight=MAX_IN_FLIGHT):
+    """
+    Bring an existing project in line with the topology, touching only what changed.
+
+    Nodes are matched by name; ones no longer in the plan, or now planned from
+    a different template, are deleted and missing ones are created. Links are
+    matched on their (node, adapter, port) endpoints; stale links are deleted
+    and missing ones created. Unchanged nodes keep their state and position.
+    Falls back to a full deploy when the project does not exist yet.
+
+    :return: Dictionary with the project ID, the name -> node ID map and the change counts.
+    """
+    links = list(topology.links())
+    check_node_plan(node_plan, links)
+
+    async with GNS3Client(ip, port, max_in_flight=max_in_flight) as client:
+        projects = await client.request("GET", "/v2/projects", expected=(200,))
+        project = next((p for p in projects if p["name"] == project_name), None)
+        if project is None:
+            print(f"Project {project_name} not found, deploying it from scratch")
+            return await create_project(client, project_name, node_plan, links, endpoint_ports)
+
+        project_id = project["project_id"]
+        base = f"/v2/projects/{project_id}"
+        if project.get("status") != "opened":
+            await client.request("POST", f"{base}/open", expected=(200, 201))
+
+        existing_nodes, existing_links = await asyncio.gather(
+            client.request("GET", f"{base}/nodes", expected=(200,)),
+            client.request("GET", f"{base}/links", expected=(200,)),
+        )
+
+        # Nodes: keep those with the same name and template, replace or remove the rest
+        planned = {node[0]: node for node in node_plan}
+        node_ids = {}
+        stale_nodes = []
+        for node in existing_nodes:
+            plan = planned.get(node["name"])
+            template_id = plan[1].get("template_id") if plan else None
+            if plan is None or node["name"] in node_ids or (
+                    template_id and node.get("template_id") and node["template_id"] != template_id):
+                stale_nodes.append(node["node_id"])
+            else:
+                node_ids[node["name"]] = node["node_id"]
+        new_nodes = [node for name, node in planned.items() if name not in node_ids]
+
+        # Links: compare endpoint keys; links on removed nodes go away with them
+        wanted = {}
+        for link in links:
+            if link[0] in node_ids and link[1] in node_ids:
+                body = link_body(link, node_ids, endpoint_ports)
+                endpoints = [(n["node_id"], n["adapter_number"], n["port_number"]) for n in body["nodes"]]
+                wanted.setdefault(link_key(endpoints), link)
+        stale_node_set = set(stale_nodes)
+        stale_links = []
+        for link in existing_links:
+            endpoints = [(n["node_id"], n["adapter_number"], n["port_number"]) for n in link["nodes"]]
+            if any(node_id in stale_node_set for node_id, _, _ in endpoints):
+                continue
+            key = link_key(endpoints)
+            if key in wanted:
+                del wanted[key]  # already present
+            else:
+                stale_links.append(link["link_id"])
+        new_links = list(wanted.values()) + [link for link in links if link[0] not in node_ids or link[1] not in node_ids]
+
+        # Free ports first, then create what is missing
+        await delete_all(client, [f"{base}/links/{link_id}" for link_id in stale_links])
+        await delete_all(client, [f"{base}/nodes/{node_id}" for node_id in stale_nodes])
+        node_ids.update(await create_nodes(client, project_id, new_nodes))
+        await create_links(client, project_id, new_links, node_ids, endpoint_ports)
+
+    changes = {"added_nodes": len(new_nodes), "removed_nodes": len(stale_nodes),
+               "added_links": len(new_links), "removed_links": len(stale_links)}
+    print(f"Reconciled project {project_name} ({project_id}): "
+          f"+{changes['added_nodes']}/-{changes['removed_nodes']} nodes, "
+          f"+{changes['added_links']}/-{changes['removed_links']} links")
+    return {"project_id": project_id, "node_ids": node_ids, **changes}
+
+
+def reconcile(ip, port, project_name, node_plan, topology, endpoint_ports, max_in_flight=MAX_IN_FLIGHT):
+    """Synchronous wrapper around reconcile_async()."""
+    return asyncio.run(reconcile_async(ip, port, project_name, node_plan, topology, endpoint_ports, max_in_flight))
@@ -0,0 +1,99 @@
+"""
+parse_cache.py
+
+Content-addressed cache for parsed diagrams.
+
+An entry is keyed by the SHA-256 of the uploaded file, its format and
+PARSER_VERSION, and holds the parsed Topology (machines, links and adapter
+numbers) in its compact array form. Entries are stored as zlib-compressed
+JSON in a SQLite file and the least recently used ones are evicted once the
+cache grows past its size cap, so re-deploying an unchanged diagram skips
+parsing entirely.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+from topology import Topology
+
+# Bump whenever a parser change alters the machines or connections it produces.
+PARSER_VERSION = 3
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "parse_cache.sqlite")
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(path, fmt):
+    """Build the cache key for an upload parsed as the given format."""
+    return f"{fmt}:{PARSER_VERSION}:{file_digest(path)}"
+
+
+class ParseCache:
+    """SQLite-backed LRU store of parsed topologies."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=MAX_CACHE_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY,"
+            " data BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self._db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._db.close()
+
+    def get(self, key):
+        """Return the cached Topology for a key, or None on a miss."""
+        row = self._db.execute("SELECT data FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._db.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+        self._db.commit()
+        return Topology.from_dict(json.loads(zlib.decompress(row[0])))
+
+    def put(self, key, topology):
+        """Store a parsed topology and evict the least recently used entries beyond the size cap."""
+        data = zlib.compress(json.dumps(topology.to_dict(), separators=(",", ":")).encode("utf-8"))
+        self._db.execute(
+            "INSERT OR REPLACE INTO entries (key, data, size, last_used) VALUES (?, ?, ?, ?)",
+            (key, data, len(data), time.time()),
+        )
+        self._evict()
+        self._db.commit()
+
+    def _evict(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
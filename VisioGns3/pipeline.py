@@ -0,0 +1,295 @@
+"""
+pipeline.py
+
+Runs the whole upload -> GNS3 chain in a single Python process.
+
+Every stage of automation_final.sh used to be its own interpreter that re-read
+the JSON/TXT files written by the stage before it. Here the stages hand their
+parsed results to each other in memory; the intermediate files under
+Generated_files/ are only written when --debug-files is given.
+"""
+
+import argparse
+import html
+import json
+import os
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The per-format stage modules live in vsdx/, xml/ and svg/ and are plain scripts,
+# so their directories go on the path instead of being imported as packages.
+sys.path.extend(os.path.join(BASE_DIR, sub) for sub in ("vsdx", "xml", "svg"))
+
+import retrieve_detail
+import gns3_deployer
+import parse_cache
+from topology import Topology
+import extract_vsdx
+import machine_info
+import ListConnections
+import addportnumbers
+import generate_machines_yaml
+import generate_connections_yaml
+import extract_xml
+import ListConnections_xml
+import generate_machines_yaml_xml
+import generate_connections_yaml_xml
+import extract_svg
+import ListConnections_svg
+import generate_machines_yaml_svg
+import generate_connections_yaml_svg
+
+UPLOADS_DIR = os.path.join(BASE_DIR, "uploads")
+
+
+def get_latest_upload(uploads_dir):
+    """Return the most recent file from the uploads directory."""
+    files = [os.path.join(uploads_dir, f) for f in os.listdir(uploads_dir) if os.path.isfile(os.path.join(uploads_dir, f))]
+    if not files:
+        raise FileNotFoundError("No files found in uploads directory.")
+    return max(files, key=os.path.getmtime)  # newest file
+
+
+def parse_vsdx(vsdx_path):
+    """
+    Parse a .vsdx upload by streaming its pages and masters XML straight from the archive.
+
+    Every page is parsed (in parallel for multi-page drawings) and merged into one topology.
+
+    :return: Topology with adapter numbers assigned.
+    """
+    shapes, masters, connects, portals = extract_vsdx.stream_vsdx(vsdx_path)
+
+    machine_names = machine_info.collect_machine_names(
+        {shape_id: shape["master_id"] for shape_id, shape in shapes.items()},
+        machine_info.machine_masters(masters),
+    )
+
+    connections = ListConnections.build_connections(shapes, connects, masters)
+    if portals:
+        connections = ListConnections.join_off_page_connections(connections, shapes, masters, portals)
+    addportnumbers.add_adapter_numbers(connections)
+
+    return Topology.from_lists(machine_names, connections)
+
+
+def parse_drawio_xml(xml_path):
+    """
+    Parse a draw.io .xml upload once and derive machines and connections from the same tree.
+
+    :return: Topology with adapter numbers assigned.
+    """
+    root = ET.parse(xml_path).getroot()
+
+    machine_names = extract_xml.machine_names_from_root(root)
+    devices, links = ListConnections_xml.parse_drawio_root(root)
+
+    return Topology.from_lists(machine_names, ListConnections_xml.process_connections(devices, links))
+
+
+def parse_drawio_svg(svg_path):
+    """
+    Parse a draw.io .svg upload once and derive machines and connections from its embedded diagram.
+
+    :return: Topology with adapter numbers assigned.
+    """
+    root = ET.parse(svg_path).getroot()
+
+    content_attr = root.get("content", "")
+    if not content_attr:
+        raise ValueError("No content attribute found in SVG file.")
+    content_root = ET.fromstring(html.unescape(content_attr))
+
+    machine_names = extract_svg.machine_names_from_content(content_root)
+    devices, links = ListConnections_svg.parse_drawio_content(content_root)
+
+    return Topology.from_lists(machine_names, ListConnections_svg.process_connections(devices, links))
+
+
+# File extension -> (parser, machines playbook module, connections playbook module)
+FORMATS = {
+    "vsdx": (parse_vsdx, generate_machines_yaml, generate_connections_yaml),
+    "xml": (parse_drawio_xml, generate_machines_yaml_xml, generate_connections_yaml_xml),
+    "svg": (parse_drawio_svg, generate_machines_yaml_svg, generate_connections_yaml_svg),
+}
+
+
+def get_format(upload_path):
+    """Return the pipeline format key for an uploaded file."""
+    ext = upload_path.rsplit(".", 1)[-1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported file type: {ext}")
+    return ext
+
+
+def parse_upload(upload_path, fmt, cache_path=parse_cache.DEFAULT_CACHE_PATH):
+    """
+    Parse an upload, reusing the cached result when the same file was parsed before.
+
+    :param cache_path: SQLite parse cache, or None to always parse.
+    :return: Topology with adapter numbers assigned.
+    """
+    parse = FORMATS[fmt][0]
+    if cache_path is None:
+        return parse(upload_path)
+
+    key = parse_cache.cache_key(upload_path, fmt)
+    with parse_cache.ParseCache(cache_path) as cache:
+        cached = cache.get(key)
+        if cached is not None:
+            print("Using cached parse result.")
+            return cached
+
+        topology = parse(upload_path)
+        cache.put(key, topology)
+    return topology
+
+
+def write_debug_files(output_dir, upload_path, ip, port, raw_templates, topology):
+    """Write the intermediate files the standalone stage scripts used to exchange."""
+    generated_dir = os.path.join(output_dir, "Generated_files")
+    os.makedirs(generated_dir, exist_ok=True)
+
+    retrieve_detail.save_server_details_to_file(ip, port, os.path.join(generated_dir, "gns3_server_details.txt"))
+    retrieve_detail.save_templates_to_json(raw_templates, os.path.join(generated_dir, "gns3_templates.json"))
+
+    with open(os.path.join(generated_dir, "machine_names.txt"), "w") as f:
+        for name in topology.machine_names:
+            f.write(name + "\n")
+
+    with open(os.path.join(generated_dir, "Connections.json"), "w") as f:
+        json.dump(topology.connections, f, indent=4)
+
+    with open(os.path.join(output_dir, "vsdx_path.txt"), "w") as f:
+        f.write(upload_path)
+
+    print(f"Intermediate files written to {generated_dir}")
+
+
+def run_playbooks(playbooks_dir):
+    """Run the generated Ansible playbooks against the GNS3 server."""
+    for playbook in ("Gns3_Machines.yaml", "Gns3_Connections.yaml"):
+        print(f"➡️ Running {playbook}")
+        sys.stdout.flush()
+        subprocess.run(["ansible-playbook", playbook], cwd=playbooks_dir, check=True)
+
+
+def write_playbooks(output_dir, ip, port, topology, templates, project_name, machines_module, connections_module):
+    """Export the topology as the Ansible playbooks under Main_playbooks/."""
+    playbooks_dir = os.path.join(output_dir, "Main_playbooks")
+    os.makedirs(playbooks_dir, exist_ok=True)
+
+    machines_yaml = machines_module.build_machines_yaml(ip, port, topology.machine_names, templates, project_name)
+    with open(os.path.join(playbooks_dir, "Gns3_Machines.yaml"), "w") as f:
+        f.write(machines_yaml)
+
+    connections_yaml = connections_module.build_connections_playbook(ip, port, topology.connections, project_name)
+    with open(os.path.join(playbooks_dir, "Gns3_Connections.yaml"), "w") as f:
+        f.write(connections_yaml)
+
+    print(f"Playbooks written to {playbooks_dir}")
+    return playbooks_dir
+
+
+def run_pipeline(upload_path, output_dir=BASE_DIR, debug_files=False, deploy=True, deployer="rest",
+                 export_playbooks=False, conf_path=retrieve_detail.GNS3_CONF_PATH,
+                 cache_path=parse_cache.DEFAULT_CACHE_PATH, max_in_flight=gns3_deployer.MAX_IN_FLIGHT,
+                 reconcile=False, template_ttl=retrieve_detail.TEMPLATE_CACHE_TTL):
+    """
+    Run every stage for one uploaded diagram.
+
+    :param upload_path: Path to the .vsdx, .xml or .svg diagram.
+    :param output_dir: Directory receiving Main_playbooks/ and Generated_files/ when they are written.
+    :param debug_files: Also write the intermediate Generated_files/ outputs.
+    :param deploy: Create the project on the GNS3 server.
+    :param deployer: "rest" to call the GNS3 API directly, "ansible" to run the generated playbooks.
+    :param export_playbooks: Write the Ansible playbooks even when deploying over REST.
+    :param conf_path: GNS3 server configuration file.
+    :param cache_path: Parse cache location, or None to disable caching.
+    :param max_in_flight: Maximum concurrent requests to the GNS3 server for the REST deployer.
+    :param reconcile: Update the existing project of the same name in place instead of creating a new one (REST only).
+    :param template_ttl: Seconds a cached template catalog is reused without contacting the server.
+    :return: Dictionary with the project name and the parsed Topology.
+    """
+    if reconcile and deploy and deployer != "rest":
+        raise ValueError("Reconcile is only supported by the REST deployer; the playbooks always create a new project.")
+
+    fmt = get_format(upload_path)
+    _, machines_module, connections_module = FORMATS[fmt]
+
+    print(f"📂 Processing {os.path.basename(upload_path)} ({fmt})")
+
+    print("➡️ Retrieving GNS3 server details and templates")
+    ip, port = retrieve_detail.get_gns3_server_details(conf_path)
+    print(f"Found GNS3 server: IP={ip}, Port={port}")
+    raw_templates = retrieve_detail.fetch_templates(ip, port, ttl=template_ttl)
+    templates = retrieve_detail.format_templates(raw_templates)
+    print(f"Fetched {len(raw_templates)} templates from the server.")
+
+    print("➡️ Parsing diagram")
+    topology = parse_upload(upload_path, fmt, cache_path)
+    print(f"Found {len(topology.machine_names)} machines and {topology.link_count} connections.")
+
+    project_name = machines_module.get_project_name_from_vsdx(upload_path)
+
+    if debug_files:
+        write_debug_files(output_dir, upload_path, ip, port, raw_templates, topology)
+
+    playbooks_dir = None
+    if export_playbooks or deployer == "ansible":
+        print("➡️ Generating playbooks")
+        playbooks_dir = write_playbooks(output_dir, ip, port, topology, templates, project_name,
+                                        machines_module, connections_module)
+
+    if deploy:
+        if deployer == "ansible":
+            print("▶️ Running Playbooks...")
+            run_playbooks(playbooks_dir)
+        else:
+            print("▶️ Deploying to GNS3...")
+            node_plan = machines_module.plan_nodes(topology.machine_names, templates)
+            apply = gns3_deployer.reconcile if reconcile else gns3_deployer.deploy
+            apply(ip, port, project_name, node_plan, topology, connections_module.endpoint_ports, max_in_flight)
+
+    return {"project_name": project_name, "topology": topology}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert an uploaded diagram into a GNS3 project in one process.")
+    parser.add_argument("upload", nargs="?", help="Diagram to process (default: most recent file in uploads/)")
+    parser.add_argument("--output-dir", default=BASE_DIR, help="Directory for Main_playbooks/ and Generated_files/")
+    parser.add_argument("--debug-files", action="store_true", help="Also write the intermediate Generated_files/ outputs")
+    parser.add_argument("--no-deploy", action="store_true", help="Parse only, do not create the project on the server")
+    parser.add_argument("--deployer", choices=("rest", "ansible"), default="rest",
+                        help="Deploy through the GNS3 REST API (default) or the generated Ansible playbooks")
+    parser.add_argument("--no-cache", action="store_true", help="Always parse the diagram, bypassing the parse cache")
+    parser.add_argument("--max-in-flight", type=int, default=gns3_deployer.MAX_IN_FLIGHT,
+                        help="Maximum concurrent requests to the GNS3 server (REST deployer)")
+    parser.add_argument("--reconcile", action="store_true",
+                        help="Apply only the changes to an existing project with the same name (REST deployer)")
+    parser.add_argument("--refresh-templates", action="store_true",
+                        help="Revalidate the cached template catalog with the server even if it is still fresh")
+    parser.add_argument("--export-playbooks", action="store_true", help="Also write the Ansible playbooks to Main_playbooks/")
+    args = parser.parse_args()
+    if args.reconcile and args.deployer != "rest":
+        parser.error("--reconcile requires --deployer rest; the Ansible playbooks always create a new project")
+
+    try:
+        upload_path = args.upload or get_latest_upload(UPLOADS_DIR)
+        run_pipeline(upload_path, output_dir=args.output_dir, debug_files=args.debug_files, deploy=not args.no_deploy,
+                     deployer=args.deployer, export_playbooks=args.export_playbooks,
+                     cache_path=None if args.no_cache else parse_cache.DEFAULT_CACHE_PATH,
+                     max_in_flight=args.max_in_flight, reconcile=args.reconcile,
+                     template_ttl=0 if args.refresh_templates else retrieve_detail.TEMPLATE_CACHE_TTL)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+    print("✅ Completed successfully")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
+import hashlib
+import http.client
 import json
 import os
 import re
-import subprocess
+import tempfile
+import time
 
 
 # Base directory for VisioGns3
@@ -12,6 +15,13 @@ GNS3_CONF_PATH = os.path.expanduser("~/.config/GNS3/2.2/gns3_server.conf")
 
 OUTPUT_JSON_FILE = os.path.join(BASE_DIR, "Generated_files", "gns3_templates.json")
 SERVER_DETAILS_FILE = os.path.join(BASE_DIR, "Generated_files", "gns3_server_details.txt")
+TEMPLATE_CACHE_DIR = os.path.join(BASE_DIR, "cache", "templates")
+
+HTTP_TIMEOUT = 10          # seconds
+TEMPLATE_CACHE_TTL = 300   # seconds a cached catalog is used without asking the server
+
+# Open keep-alive connections, one per (ip, port)
+_connections = {}
 
 def get_gns3_server_details(conf_path):
     """
@@ -37,22 +47,129 @@ def save_server_details_to_file(ip, port, file_path):
     except Exception as e:
         raise RuntimeError(f"Failed to save server details to file: {e}")
 
-def fetch_templates(ip, port):
+def http_get(ip, port, path, headers=None, timeout=HTTP_TIMEOUT):
+    """
+    GET a path from the GNS3 server over a reused keep-alive connection.
+
+    :return: (status, response headers, body bytes)
+    """
+    key = (ip, str(port))
+    for attempt in range(2):
+        conn = _connections.get(key)
+        if conn is None:
+            conn = _connections[key] = http.client.HTTPConnection(ip, int(port), timeout=timeout)
+        try:
+            conn.request("GET", path, headers=headers or {})
+            response = conn.getresponse()
+            body = response.read()
+        except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+            # The server closed an idle keep-alive connection; retry once on a fresh one
+            conn.close()
+            del _connections[key]
+            if attempt:
+                raise
+            continue
+        except Exception:
+            conn.close()
+            _connections.pop(key, None)
+            raise
+        if response.will_close:
+            conn.close()
+            del _connections[key]
+        return response.status, response.headers, body
+
+def template_cache_path(ip, port, cache_dir=TEMPLATE_CACHE_DIR):
+    """Return the catalog cache file for one server."""
+    return os.path.join(cache_dir, f"{ip}_{port}.json")
+
+def load_template_cache(path):
+    """Load a cached catalog, or None if there is no usable cache file."""
+    try:
+        with open(path, "r") as file:
+            entry = json.load(file)
+    except (OSError, ValueError):
+        return None
+    # Written by another version or by hand: without a catalog there is nothing to revalidate
+    if not isinstance(entry, dict) or not isinstance(entry.get("templates"), list):
+        return None
+    return entry
+
+def save_template_cache(path, entry):
+    """Write a catalog cache entry atomically."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # A unique temp file per writer: parallel jobs may refresh the same catalog at once
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as file:
+            json.dump(entry, file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def template_digests(templates):
+    """Map template IDs to a digest of their definition."""
+    return {
+        template.get("template_id"): hashlib.sha256(json.dumps(template, sort_keys=True).encode("utf-8")).hexdigest()
+        for template in templates
+    }
+
+def fetch_templates(ip, port, cache_dir=TEMPLATE_CACHE_DIR, ttl=TEMPLATE_CACHE_TTL):
     """
     Fetches the templates from the GNS3 server using the IP and port.
+
+    The catalog is cached per server: within ttl seconds the cached copy is
+    returned without any request; after that it is revalidated with
+    If-None-Match/If-Modified-Since when the server supplied validators, and
+    the templates that changed are reported.
+
+    :param cache_dir: Catalog cache directory, or None to always fetch.
     """
-    url = f"http://{ip}:{port}/v2/templates"
+    path = template_cache_path(ip, port, cache_dir) if cache_dir else None
+    entry = load_template_cache(path) if path else None
+
+    # An entry without a fetch time is treated as stale and revalidated
+    if entry and time.time() - entry.get("fetched_at", 0) < ttl:
+        print(f"Using cached templates for {ip}:{port}")
+        return entry["templates"]
+
+    headers = {}
+    if entry and entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry and entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+
     try:
-        result = subprocess.run(["curl", "-X", "GET", url], capture_output=True, text=True)
-        if result.returncode != 0:
-            raise RuntimeError(f"Failed to fetch templates: {result.stderr}")
-        return json.loads(result.stdout)
+        status, response_headers, body = http_get(ip, port, "/v2/templates", headers)
     except Exception as e:
         raise RuntimeError(f"Error fetching templates: {e}")
 
-def save_templates_to_json(templates, output_file):
+    if status == 304 and entry:
+        print(f"Templates for {ip}:{port} unchanged")
+        templates = entry["templates"]
+    elif status == 200:
+        templates = json.loads(body)
+        if entry:
+            old_digests = template_digests(entry["templates"])
+            changed = [tid for tid, digest in template_digests(templates).items() if old_digests.get(tid) != digest]
+            removed = len(set(old_digests) - {template.get("template_id") for template in templates})
+            print(f"Templates for {ip}:{port}: {len(changed)} new or changed, {removed} removed")
+    else:
+        raise RuntimeError(f"Failed to fetch templates: HTTP {status}: {body[:200]!r}")
+
+    if path:
+        save_template_cache(path, {
+            "fetched_at": time.time(),
+            "etag": response_headers.get("ETag") or (entry or {}).get("etag"),
+            "last_modified": response_headers.get("Last-Modified") or (entry or {}).get("last_modified"),
+            "templates": templates,
+        })
+    return templates
+
+def format_templates(templates):
     """
-    Saves the templates to a JSON file in the specified format.
+    Converts the raw template list from the server into the name-keyed format used by the YAML generators.
     """
     formatted_templates = {}
 
@@ -99,6 +216,14 @@ def save_templates_to_json(templates, output_file):
                 }
             }
 
+    return formatted_templates
+
+def save_templates_to_json(templates, output_file):
+    """
+    Saves the templates to a JSON file in the specified format.
+    """
+    formatted_templates = format_templates(templates)
+
     try:
         with open(output_file, "w") as file:
             json.dump(formatted_templates, file, indent=4)
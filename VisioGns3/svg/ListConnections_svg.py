@@ -33,6 +33,10 @@ def parse_drawio_svg(svg_file):
     # Parse the embedded XML structure
     content_root = ET.fromstring(decoded_content)
     
+    return parse_drawio_content(content_root)
+
+def parse_drawio_content(content_root):
+    """Extract devices and connections from the decoded diagram embedded in a draw.io SVG."""
     devices = {}
     name_counter = defaultdict(int)
     connections = []
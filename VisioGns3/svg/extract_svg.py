@@ -53,7 +53,6 @@ def extract_machine_names(svg_file):
     }
     
     machine_names = []
-    name_counter = defaultdict(int)
     
     # Look for the embedded mxfile content attribute
     content_attr = root.get('content', '')
@@ -69,35 +68,7 @@ def extract_machine_names(svg_file):
             # Extract mxGraphModel from the content
             content_root = ET.fromstring(decoded_content)
             
-            # Find all mxCell elements in the embedded structure
-            for cell in content_root.findall(".//mxCell"):
-                style = cell.get("style", "")
-                value = cell.get("value", "").strip()
-                
-                # Check for all Cisco device types
-                if any(keyword in style for keyword in [
-                    "mxgraph.cisco.routers",
-                    "mxgraph.cisco.switches",
-                    "mxgraph.cisco.computers_and_peripherals",
-                    "mxgraph.cisco.servers",
-                    "mxgraph.cisco.storage",
-                    "mxgraph.cisco.hubs_and_gateways"
-                ]):
-                    if value:  # Use visible label if available
-                        base_name = value
-                    else:
-                        # Extract device type from style
-                        base = style.split(";")[0]
-                        base_name = base.split(".")[-1]
-                    
-                    # Count duplicates
-                    name_counter[base_name] += 1
-                    if name_counter[base_name] > 1:
-                        machine_name = f"{base_name}-{name_counter[base_name]}"
-                    else:
-                        machine_name = base_name
-                    
-                    machine_names.append(machine_name)
+            machine_names = machine_names_from_content(content_root)
         except Exception as e:
             print(f"Error parsing embedded content: {e}")
     
@@ -112,6 +83,43 @@ def extract_machine_names(svg_file):
     
     return machine_names
 
+# Extract machine names from the decoded diagram embedded in an SVG
+def machine_names_from_content(content_root):
+    machine_names = []
+    name_counter = defaultdict(int)
+    
+    # Find all mxCell elements in the embedded structure
+    for cell in content_root.findall(".//mxCell"):
+        style = cell.get("style", "")
+        value = cell.get("value", "").strip()
+        
+        # Check for all Cisco device types
+        if any(keyword in style for keyword in [
+            "mxgraph.cisco.routers",
+            "mxgraph.cisco.switches",
+            "mxgraph.cisco.computers_and_peripherals",
+            "mxgraph.cisco.servers",
+            "mxgraph.cisco.storage",
+            "mxgraph.cisco.hubs_and_gateways"
+        ]):
+            if value:  # Use visible label if available
+                base_name = value
+            else:
+                # Extract device type from style
+                base = style.split(";")[0]
+                base_name = base.split(".")[-1]
+            
+            # Count duplicates
+            name_counter[base_name] += 1
+            if name_counter[base_name] > 1:
+                machine_name = f"{base_name}-{name_counter[base_name]}"
+            else:
+                machine_name = base_name
+            
+            machine_names.append(machine_name)
+    
+    return machine_names
+
 def main():
     latest_svg, older_files = get_latest_svg_file()
     
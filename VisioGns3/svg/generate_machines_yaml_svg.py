@@ -1,11 +1,14 @@
 import json
 import os
-import re
+import sys
 import yaml
 import math
 
 # File paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  
+sys.path.append(BASE_DIR)
+
+from template_index import TemplateIndex
 
 GNS3_SERVER_DETAILS = os.path.join(BASE_DIR, "Generated_files", "gns3_server_details.txt")
 TEMPLATES_JSON = os.path.join(BASE_DIR, "Generated_files", "gns3_templates.json")
@@ -72,24 +75,11 @@ def load_machine_names(txt_file):
     except Exception as e:
         raise RuntimeError(f"Failed to load machine names: {e}")
 
-def normalize_name(name):
-    """
-    Normalizes the device name by:
-    - Removing specific substrings like 'ONFrontView'.
-    - Removing trailing numbers.
-    - Retaining meaningful parts of the name.
-    - Removing special characters like '-', '_', and spaces.
-    - Converting to lowercase.
+def find_template(machine_name, index):
     """
-    # Remove specific substrings like 'ONFrontView' and trailing numbers
-    name = re.sub(r"ONFrontView.*$", "", name)
-    # Remove special characters and convert to lowercase
-    name = re.sub(r"[^a-zA-Z0-9]", "", name).lower()
-    return name
+    Finds the template for the given machine name through the generic keyword mapping.
 
-def find_template(machine_name, templates):
-    """
-    Finds the template for the given machine name by matching its normalized name.
+    :param index: TemplateIndex over the server's templates.
     """
     # --- xml_ prefixed machines --- 
   
@@ -98,12 +88,10 @@ def find_template(machine_name, templates):
         if keyword in base_name:
             print(f"[GENERIC] Match found: {keyword} -> {mapped_template_name}")
             # Now resolve this mapped_template_name in the real templates
-            normalized_mapped = normalize_name(mapped_template_name)
-            for template_name, template_data in templates.items():
-                normalized_template_name = normalize_name(template_name)
-                if (normalized_mapped in normalized_template_name or normalized_template_name in normalized_mapped):
-                    print(f"[GENERIC] Resolved to actual template: {template_name}")
-                    return template_data
+            match = index.match(mapped_template_name)
+            if match:
+                print(f"[GENERIC] Resolved to actual template: {match[0]}")
+                return match[1]
             print(f"[GENERIC] No actual GNS3 template found for: {mapped_template_name}")
             return None
     print(f"[GENERIC] No generic mapping found for: {machine_name}")
@@ -117,8 +105,45 @@ def nearest_square_number(count):
     upper = math.ceil(sqrt) ** 2
     return lower if (count - lower) < (upper - count) else upper
 
-def generate_yaml(ip, port, machine_names, templates, output_file, project_name):
-    """Generates the YAML file for the Ansible playbook."""
+def plan_nodes(machine_names, templates):
+    """
+    Matches every machine to a template and lays the matched machines out on a grid.
+
+    Returns a list of (machine_name, template, x, y) tuples; machines without a
+    template are reported and skipped.
+    """
+    # Calculate the nearest square number and grid size
+    count = len(machine_names)
+    nearest_square = nearest_square_number(count)
+    grid_size = int(math.sqrt(nearest_square))
+
+    # Coordinates for device placement on the canvas
+    x_coord = X_START
+    y_coord = Y_START
+    x_step = X_INCREMENT
+    y_step = Y_INCREMENT
+    counter = 0
+
+    index = TemplateIndex(templates)
+    nodes = []
+    for machine_name in machine_names:
+        template = find_template(machine_name, index)
+        if template:
+            nodes.append((machine_name, template, x_coord, y_coord))
+
+            # Update coordinates for next device
+            x_coord += x_step
+            counter += 1
+            if counter % grid_size == 0:  # Move to the next row after grid_size devices
+                x_coord = X_START
+                y_coord += y_step
+        else:
+            print(f"Template for machine '{machine_name}' not found. Please install the required template.")
+
+    return nodes
+
+def build_machines_yaml(ip, port, machine_names, templates, project_name):
+    """Builds the Ansible playbook content that creates the project and its nodes."""
     yaml_content = f"""
 - hosts: localhost
   gather_facts: no
@@ -146,34 +171,20 @@ def generate_yaml(ip, port, machine_names, templates, output_file, project_name)
         var: project_result
 """
 
-    # Calculate the nearest square number and grid size
-    count = len(machine_names)
-    nearest_square = nearest_square_number(count)
-    grid_size = int(math.sqrt(nearest_square))
-
-    # Coordinates for device placement on the canvas
-    x_coord = X_START
-    y_coord = Y_START
-    x_step = X_INCREMENT
-    y_step = Y_INCREMENT
-    counter = 0
+    for machine_name, template, x_coord, y_coord in plan_nodes(machine_names, templates):
+        # Prepare device details dynamically
+        body_details = ',\n            '.join(f'"{key}": {json.dumps(value)}' for key, value in template.items() if key not in ['name', 'x', 'y','properties'])
 
-    for machine_name in machine_names:
-        template = find_template(machine_name, templates)
-        if template:
-            # Prepare device details dynamically
-            body_details = ',\n            '.join(f'"{key}": {json.dumps(value)}' for key, value in template.items() if key not in ['name', 'x', 'y','properties'])
-
-            # Handle properties indentation and ensure replicate_network_connection_state is boolean
-            if "properties" in template:
-                properties = template["properties"]
-                properties_details = ",\n".join(f"              \"{key}\": {json.dumps(value)}" for key, value in properties.items())
-                body_details += f""",
+        # Handle properties indentation and ensure replicate_network_connection_state is boolean
+        if "properties" in template:
+            properties = template["properties"]
+            properties_details = ",\n".join(f"              \"{key}\": {json.dumps(value)}" for key, value in properties.items())
+            body_details += f""",
             "properties": {{
 {properties_details}
             }}"""
 
-            yaml_content += f"""
+        yaml_content += f"""
     - name: Add {machine_name} to the project
       uri:
         url: "{{{{ gns3_url }}}}/v2/projects/{{{{ project_result.json.project_id }}}}/nodes"
@@ -196,14 +207,12 @@ def generate_yaml(ip, port, machine_names, templates, output_file, project_name)
       debug:
         var: machine_result
 """
-            # Update coordinates for next device
-            x_coord += x_step
-            counter += 1
-            if counter % grid_size == 0:  # Move to the next row after grid_size devices
-                x_coord = X_START
-                y_coord += y_step
-        else:
-            print(f"Template for machine '{machine_name}' not found. Please install the required template.")
+
+    return yaml_content
+
+def generate_yaml(ip, port, machine_names, templates, output_file, project_name):
+    """Generates the YAML file for the Ansible playbook."""
+    yaml_content = build_machines_yaml(ip, port, machine_names, templates, project_name)
 
     # Write the generated YAML content to the output file
     try:
@@ -0,0 +1,111 @@
+"""
+template_index.py
+
+Index over a GNS3 template catalog for matching diagram machine names.
+
+find_template used to normalize every template name for every machine and
+substring-compare them one by one. The index normalizes the catalog once and
+answers the same question -- the first template, in catalog order, whose
+normalized name contains or is contained in the machine's -- through hash
+lookups:
+
+- "template in machine": every substring of the (short) machine name is looked
+  up in an exact-match map of normalized template names.
+- "machine in template": candidate templates are narrowed to those sharing all
+  of the machine name's trigrams before the substring check.
+
+Results are memoized per normalized machine name.
+"""
+
+import re
+
+
+def normalize_name(name):
+    """
+    Normalizes the device name by:
+    - Removing specific substrings like 'ONFrontView'.
+    - Removing trailing numbers.
+    - Retaining meaningful parts of the name.
+    - Removing special characters like '-', '_', and spaces.
+    - Converting to lowercase.
+    """
+    # Remove specific substrings like 'ONFrontView' and trailing numbers
+    name = re.sub(r"ONFrontView.*$", "", name)
+    # Remove special characters and convert to lowercase
+    name = re.sub(r"[^a-zA-Z0-9]", "", name).lower()
+    return name
+
+
+def trigrams(text):
+    """Return the set of 3-character substrings of text."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TemplateIndex:
+    """Lookup structure built once per templates snapshot."""
+
+    def __init__(self, templates):
+        """
+        :param templates: Dictionary of template name -> template data, in catalog order.
+        """
+        self.templates = templates
+        self._names = list(templates)
+        self._normalized = [normalize_name(name) for name in self._names]
+
+        # Exact normalized name -> position of the first template with that name
+        self._exact = {}
+        # Trigram -> positions of the templates containing it
+        self._trigrams = {}
+        for position, normalized in enumerate(self._normalized):
+            self._exact.setdefault(normalized, position)
+            for gram in trigrams(normalized):
+                self._trigrams.setdefault(gram, []).append(position)
+
+        self._memo = {}
+
+    def __len__(self):
+        return len(self._names)
+
+    def _contained_in_name(self, normalized):
+        """Position of the first template whose normalized name is a substring of normalized."""
+        best = None
+        length = len(normalized)
+        for start in range(length + 1):
+            for end in range(start, length + 1):
+                position = self._exact.get(normalized[start:end])
+                if position is not None and (best is None or position < best):
+                    best = position
+        return best
+
+    def _containing_name(self, normalized):
+        """Position of the first template whose normalized name contains normalized."""
+        if len(normalized) < 3:
+            candidates = range(len(self._normalized))
+        else:
+            postings = sorted((self._trigrams.get(gram, []) for gram in trigrams(normalized)), key=len)
+            if not postings[0]:
+                return None
+            candidates = set(postings[0]).intersection(*postings[1:])
+            candidates = sorted(candidates)
+        for position in candidates:
+            if normalized in self._normalized[position]:
+                return position
+        return None
+
+    def match(self, name):
+        """
+        Find the template matching a machine or template name.
+
+        :return: (template_name, template_data), or None when nothing matches.
+        """
+        normalized = normalize_name(name)
+        if normalized not in self._memo:
+            positions = [p for p in (self._contained_in_name(normalized), self._containing_name(normalized))
+                         if p is not None]
+            self._memo[normalized] = min(positions) if positions else None
+
+        position = self._memo[normalized]
+        if position is None:
+            return None
+        template_name = self._names[position]
+        return template_name, self.templates[template_name]
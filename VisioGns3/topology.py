@@ -0,0 +1,147 @@
+"""
+topology.py
+
+In-memory topology graph shared by the vsdx, xml and svg parsers and every
+stage after them.
+
+Node names are interned once and referred to by integer index. Edges live in
+parallel integer arrays (endpoints and adapter numbers), so memory per device
+and per link stays constant however large the diagram grows.
+"""
+
+import sys
+from array import array
+
+NO_ADAPTER = -1
+
+
+class Node:
+    """One device or connection endpoint of a topology."""
+
+    __slots__ = ("index", "name", "machine")
+
+    def __init__(self, index, name, machine):
+        self.index = index
+        self.name = name
+        self.machine = machine
+
+    def __repr__(self):
+        return f"Node({self.index}, {self.name!r}, machine={self.machine})"
+
+
+class Topology:
+    """
+    Devices and links of one diagram.
+
+    Machines are the devices to create on the GNS3 server, in diagram order.
+    Connection endpoints that are not machines (e.g. a draw.io edge attached
+    to an unlabelled shape) are still interned as nodes so links keep their
+    names, but they are not deployed.
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self._by_name = {}
+        self._machines = array("i")
+
+        self._src = array("i")
+        self._dst = array("i")
+        self._src_adapter = array("i")
+        self._dst_adapter = array("i")
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, name):
+        return name in self._by_name
+
+    def node(self, name):
+        """Return the Node record for a name."""
+        return self.nodes[self._by_name[name]]
+
+    def intern(self, name, machine=False):
+        """Return the index of a node, adding it if it is new."""
+        index = self._by_name.get(name)
+        if index is None:
+            index = len(self.nodes)
+            name = sys.intern(name)
+            self.nodes.append(Node(index, name, False))
+            self._by_name[name] = index
+        if machine and not self.nodes[index].machine:
+            self.nodes[index].machine = True
+            self._machines.append(index)
+        return index
+
+    def add_machine(self, name):
+        """Add a device to deploy and return its index."""
+        return self.intern(name, machine=True)
+
+    def add_link(self, start, end, from_adapter=NO_ADAPTER, to_adapter=NO_ADAPTER):
+        """Add a link between two node names and return its edge index."""
+        self._src.append(self.intern(start))
+        self._dst.append(self.intern(end))
+        self._src_adapter.append(from_adapter)
+        self._dst_adapter.append(to_adapter)
+        return len(self._src) - 1
+
+    @property
+    def link_count(self):
+        return len(self._src)
+
+    @property
+    def machine_names(self):
+        """Names of the devices to deploy, in diagram order."""
+        return [self.nodes[index].name for index in self._machines]
+
+    def links(self):
+        """Yield (from_name, to_name, from_adapter, to_adapter) for every link."""
+        nodes = self.nodes
+        for src, dst, src_adapter, dst_adapter in zip(self._src, self._dst, self._src_adapter, self._dst_adapter):
+            yield nodes[src].name, nodes[dst].name, src_adapter, dst_adapter
+
+    @property
+    def connections(self):
+        """Links as the {"from", "to", "from_adapter_number", "to_adapter_number"} dictionaries the playbooks use."""
+        connections = []
+        for start, end, from_adapter, to_adapter in self.links():
+            connection = {"from": start, "to": end}
+            if from_adapter != NO_ADAPTER:
+                connection["from_adapter_number"] = from_adapter
+            if to_adapter != NO_ADAPTER:
+                connection["to_adapter_number"] = to_adapter
+            connections.append(connection)
+        return connections
+
+    @classmethod
+    def from_lists(cls, machine_names, connections):
+        """Build a topology from a machine name list and connection dictionaries."""
+        topology = cls()
+        for name in machine_names:
+            topology.add_machine(name)
+        for connection in connections:
+            topology.add_link(connection["from"], connection["to"],
+                              connection.get("from_adapter_number", NO_ADAPTER),
+                              connection.get("to_adapter_number", NO_ADAPTER))
+        return topology
+
+    def to_dict(self):
+        """Compact JSON-serialisable form: node names plus flat integer arrays."""
+        return {
+            "nodes": [node.name for node in self.nodes],
+            "machines": self._machines.tolist(),
+            "links": [self._src.tolist(), self._dst.tolist(), self._src_adapter.tolist(), self._dst_adapter.tolist()],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a topology written by to_dict()."""
+        topology = cls()
+        for name in data["nodes"]:
+            topology.intern(name)
+        for index in data["machines"]:
+            topology.nodes[index].machine = True
+            topology._machines.append(index)
+        for column, values in zip((topology._src, topology._dst, topology._src_adapter, topology._dst_adapter),
+                                  data["links"]):
+            column.extend(values)
+        return topology
@@ -59,19 +59,55 @@ def parse_masters_xml(masters_xml):
 
     return masters
 
-def main(pages_xml, masters_xml, output_json):
+class EdgeSet:
     """
-    Main function to parse pages1.xml and masters.xml, and output connections to a JSON file.
+    Insertion-ordered set of {"from", "to"} connections keyed on their endpoints.
     
-    :param pages_xml: Path to the pages1.xml file.
-    :param masters_xml: Path to the masters.xml file.
-    :param output_json: Path to the output JSON file.
+    Membership is a hash lookup on the (from, to) pair, so deduplicating n
+    connections takes linear time. With undirected=True a link and its
+    reverse count as the same connection; the first one seen is kept.
     """
-    # Parse the XML files
-    shapes, connections = parse_pages_xml(pages_xml)
-    masters = parse_masters_xml(masters_xml)
 
-    processed_connections = []
+    def __init__(self, undirected=False):
+        self.undirected = undirected
+        self._edges = {}
+
+    def key(self, start, end):
+        if self.undirected and end < start:
+            return end, start
+        return start, end
+
+    def add(self, start, end):
+        """Add a connection; return False if it was already present."""
+        key = self.key(start, end)
+        if key in self._edges:
+            return False
+        self._edges[key] = {"from": start, "to": end}
+        return True
+
+    def __contains__(self, connection):
+        return self.key(connection["from"], connection["to"]) in self._edges
+
+    def __len__(self):
+        return len(self._edges)
+
+    def __iter__(self):
+        return iter(self._edges.values())
+
+    def to_list(self):
+        return list(self._edges.values())
+
+def build_connections(shapes, connections, masters, undirected=False):
+    """
+    Pair connector ends into device-to-device connections.
+    
+    :param shapes: Dictionary of shapes from parse_pages_xml.
+    :param connections: List of connection elements from parse_pages_xml.
+    :param masters: Dictionary mapping master IDs to device names.
+    :param undirected: Treat a link and its reverse as duplicates.
+    :return: List of {"from", "to"} connection dictionaries.
+    """
+    processed_connections = EdgeSet(undirected)
     connection_groups = {}
 
     # Group connections by their FromSheet value
@@ -107,14 +143,66 @@ def main(pages_xml, masters_xml, output_json):
                 start_with_id = f"{start_name}{start_sheet}".replace(" ", "")
                 end_with_id = f"{end_name}{end_sheet}".replace(" ", "")
 
-                # Create a connection dictionary
-                connection = {
-                    "from": start_with_id,
-                    "to": end_with_id
-                }
+                # Duplicates are dropped by the edge set
+                processed_connections.add(start_with_id, end_with_id)
+
+    return processed_connections.to_list()
+
+def join_off_page_connections(connections, shapes, masters, portals, undirected=False):
+    """
+    Replace connections that run through paired off-page references with direct device links.
+
+    Connections to a reference without a partner are dropped.
+    
+    :param connections: List of {"from", "to"} connection dictionaries from build_connections.
+    :param shapes: Dictionary of shapes keyed like the connections' sheets.
+    :param masters: Dictionary mapping master IDs to device names.
+    :param portals: Dictionary mapping every off-page reference shape key to its pair group.
+    :param undirected: Treat a link and its reverse as duplicates.
+    :return: List of connections without off-page reference endpoints.
+    """
+    portal_groups = {}
+    for sheet, group in portals.items():
+        name = masters.get(shapes[sheet]["master_id"], "Unknown Device")
+        portal_groups[f"{name}{sheet}".replace(" ", "")] = group
+
+    joined = EdgeSet(undirected)
+    attached = {}  # group -> reference name -> devices connected to that reference
+    for connection in connections:
+        start, end = connection["from"], connection["to"]
+        if start in portal_groups and end in portal_groups:
+            continue
+        if start in portal_groups:
+            attached.setdefault(portal_groups[start], {}).setdefault(start, []).append(end)
+        elif end in portal_groups:
+            attached.setdefault(portal_groups[end], {}).setdefault(end, []).append(start)
+        else:
+            joined.add(start, end)
+
+    # Devices on different references of the same group are linked directly
+    for references in attached.values():
+        sides = list(references.values())
+        for i, devices in enumerate(sides):
+            for other_devices in sides[i + 1:]:
+                for start in devices:
+                    for end in other_devices:
+                        joined.add(start, end)
+
+    return joined.to_list()
+
+def main(pages_xml, masters_xml, output_json):
+    """
+    Main function to parse pages1.xml and masters.xml, and output connections to a JSON file.
+    
+    :param pages_xml: Path to the pages1.xml file.
+    :param masters_xml: Path to the masters.xml file.
+    :param output_json: Path to the output JSON file.
+    """
+    # Parse the XML files
+    shapes, connections = parse_pages_xml(pages_xml)
+    masters = parse_masters_xml(masters_xml)
 
-                if connection not in processed_connections:  # Avoid duplicates
-                    processed_connections.append(connection)
+    processed_connections = build_connections(shapes, connections, masters)
 
     # Write the processed connections to a JSON file
     with open(output_json, 'w') as json_file:
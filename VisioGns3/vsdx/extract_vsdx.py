@@ -1,5 +1,20 @@
 import zipfile
 import os
+import posixpath
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+# XML namespaces and the archive members read by the streaming extractor
+VISIO_NS = "{http://schemas.microsoft.com/office/visio/2012/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+PAGES_XML = "visio/pages/pages.xml"
+PAGES_RELS = "visio/pages/_rels/pages.xml.rels"
+PAGE_XML = "visio/pages/page1.xml"
+MASTERS_XML = "visio/masters/masters.xml"
+
+# Master name of the shapes that continue a connection on another page
+OFF_PAGE_MASTER = "Off-page reference"
 
 # Function to get the latest .vsdx file and list of older files
 def get_latest_vsdx_file():
@@ -28,46 +43,219 @@ def get_latest_vsdx_file():
 
     return latest_vsdx, older_files
 
-# Function to delete old .vsdx files
-def clean_old_vsdx_files(older_files):
-    for file in older_files:
-        try:
-            os.remove(file)
-            print(f"Deleted old file: {file}")
-        except Exception as e:
-            print(f"Error deleting {file}: {e}")
-
 def save_vsdx_path(vsdx_file):
     # Save the path of the latest VSDX file
     path = os.path.expanduser("~/INDA/VisioGns3/vsdx_path.txt")
     with open(path, "w") as file:
         file.write(vsdx_file)
 
+def iter_elements(stream, tags):
+    """
+    Stream an XML document and yield (event, tag, attributes) for every element in tags.
+
+    Both "start" and "end" events are reported; attributes are only filled in
+    on "start". Elements are cleared and detached from their parent as soon as
+    they end, so memory stays flat no matter how large the document is.
+    """
+    parents = []
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            if elem.tag in tags:
+                yield event, elem.tag, dict(elem.attrib)
+            parents.append(elem)
+        else:
+            if elem.tag in tags:
+                yield event, elem.tag, None
+            parents.pop()
+            elem.clear()
+            if parents:
+                del parents[-1][-1]  # elem is always the last child seen so far
+
+def read_masters(archive):
+    """Map every master ID in masters.xml to its (raw) name."""
+    masters = {}
+    with archive.open(MASTERS_XML) as stream:
+        for event, _, attrib in iter_elements(stream, {VISIO_NS + "Master"}):
+            if event == "start" and attrib.get("ID"):
+                masters[attrib["ID"]] = attrib.get("Name")
+    return masters
+
+def list_pages(archive):
+    """
+    List the foreground pages of the drawing in document order.
+
+    :return: List of (page_name, member) tuples read from pages.xml and its relationships.
+    """
+    if PAGES_XML not in archive.NameToInfo:
+        return [("Page-1", PAGE_XML)]
+
+    targets = {}
+    with archive.open(PAGES_RELS) as stream:
+        for event, _, attrib in iter_elements(stream, {PKG_REL_NS + "Relationship"}):
+            if event == "start":
+                targets[attrib.get("Id")] = posixpath.normpath(posixpath.join("visio/pages", attrib.get("Target")))
+
+    pages = []
+    page = None
+    with archive.open(PAGES_XML) as stream:
+        for event, tag, attrib in iter_elements(stream, {VISIO_NS + "Page", VISIO_NS + "Rel"}):
+            if event != "start":
+                continue
+            if tag == VISIO_NS + "Page":
+                page = None if attrib.get("Background") == "1" else attrib.get("NameU") or attrib.get("Name")
+            elif page is not None and attrib.get(REL_NS + "id") in targets:
+                pages.append((page, targets[attrib.get(REL_NS + "id")]))
+    return pages
+
+def read_page(archive, page_xml=PAGE_XML):
+    """
+    Collect the shapes, connects and hyperlinks of one page in a single streaming pass.
+
+    :return: (shapes, connects, hyperlinks) where shapes and connects use the
+             format of ListConnections and hyperlinks maps shape IDs to the
+             SubAddress of their hyperlink (used by off-page references).
+    """
+    shape_tag = VISIO_NS + "Shape"
+    connect_tag = VISIO_NS + "Connect"
+    cell_tag = VISIO_NS + "Cell"
+
+    shapes = {}
+    connects = []
+    hyperlinks = {}
+    open_shapes = []
+    with archive.open(page_xml) as stream:
+        for event, tag, attrib in iter_elements(stream, {shape_tag, connect_tag, cell_tag}):
+            if tag == shape_tag:
+                if event == "end":
+                    open_shapes.pop()
+                    continue
+                shape_id = attrib.get("ID")
+                open_shapes.append(shape_id)
+                master_id = attrib.get("Master")
+                if shape_id and master_id:
+                    shapes[shape_id] = {"name": attrib.get("Name"), "name_u": attrib.get("NameU"), "master_id": master_id}
+            elif event == "end":
+                continue
+            elif tag == connect_tag:
+                connects.append({
+                    "from_sheet": attrib.get("FromSheet"),
+                    "to_sheet": attrib.get("ToSheet"),
+                    "from_cell": attrib.get("FromCell")
+                })
+            elif attrib.get("N") == "SubAddress" and attrib.get("V") and open_shapes:
+                hyperlinks[open_shapes[-1]] = attrib["V"]
+    return shapes, connects, hyperlinks
+
+def read_page_from_file(vsdx_path, page_xml):
+    """Process pool entry point: open the archive in the worker and read one page."""
+    with zipfile.ZipFile(vsdx_path, 'r') as archive:
+        return read_page(archive, page_xml)
+
+def page_key(shape_id, page_index):
+    """Key of a shape in the merged topology; pages after the first get a -p<n> suffix."""
+    if page_index == 0 or shape_id is None:
+        return shape_id
+    return f"{shape_id}-p{page_index + 1}"
+
+def link_off_page_references(page_names, page_results, shapes, masters):
+    """
+    Pair the off-page reference shapes that point at each other across pages.
+
+    :return: Dictionary mapping the merged shape key of every off-page
+             reference to a group ID. A reference without a partner is
+             alone in its group, so links to it lead nowhere and are dropped.
+    """
+    references = {}   # merged key -> (page name, target page, target shape name)
+    by_name = {}      # (page name, shape name) -> merged key
+    for page_index, (page_name, (_, _, hyperlinks)) in enumerate(zip(page_names, page_results)):
+        for shape_id, sub_address in hyperlinks.items():
+            key = page_key(shape_id, page_index)
+            shape = shapes.get(key)
+            if not shape or OFF_PAGE_MASTER not in (masters.get(shape["master_id"]) or ""):
+                continue
+            target_page, _, target_shape = sub_address.rpartition("/") if "/" in sub_address else (sub_address, "", None)
+            references[key] = (page_name, target_page, target_shape)
+            for name in (shape["name"], shape["name_u"]):
+                if name:
+                    by_name[(page_name, name)] = key
+
+    groups = {}
+    def group_of(key):
+        while groups.get(key, key) != key:
+            key = groups[key]
+        return key
+
+    for key, (page_name, target_page, target_shape) in references.items():
+        if target_shape:
+            partner = by_name.get((target_page, target_shape))
+        else:
+            # Only the page is named: pair with the single reference on that page pointing back here
+            candidates = [other for other, (other_page, back_page, _) in references.items()
+                          if other_page == target_page and back_page == page_name]
+            partner = candidates[0] if len(candidates) == 1 else None
+        if partner and partner != key:
+            groups[group_of(key)] = group_of(partner)
+            groups.setdefault(partner, partner)
+
+    return {key: group_of(key) for key in references}
+
+def stream_vsdx(vsdx_path, max_workers=None):
+    """
+    Read shapes, masters and connects of every page straight from the .vsdx archive.
+
+    The zip members are parsed as streams; nothing is extracted to disk.
+    Drawings with several pages are parsed in parallel, one page per worker
+    process, and merged into one topology: shape keys of later pages carry a
+    -p<n> suffix. Every off-page reference is reported as a portal, grouped
+    with the reference it points at (see link_off_page_references).
+
+    :return: (shapes, masters, connects, portals)
+    """
+    with zipfile.ZipFile(vsdx_path, 'r') as archive:
+        masters = read_masters(archive)
+        pages = list_pages(archive)
+        if not pages:
+            raise ValueError("No foreground pages")
+        if len(pages) == 1:
+            page_results = [read_page(archive, pages[0][1])]
+
+    if len(pages) > 1:
+        workers = min(len(pages), max_workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            page_results = list(executor.map(read_page_from_file, [vsdx_path] * len(pages), [member for _, member in pages]))
+
+    shapes = {}
+    connects = []
+    for page_index, (page_shapes, page_connects, _) in enumerate(page_results):
+        for shape_id, shape in page_shapes.items():
+            shapes[page_key(shape_id, page_index)] = shape
+        for connect in page_connects:
+            connects.append({
+                "from_sheet": page_key(connect["from_sheet"], page_index),
+                "to_sheet": page_key(connect["to_sheet"], page_index),
+                "from_cell": connect["from_cell"]
+            })
+
+    portals = link_off_page_references([name for name, _ in pages], page_results, shapes, masters)
+
+    return shapes, masters, connects, portals
+
 def main():
-    # Get the latest .vsdx file and list of older ones
-    latest_vsdx, older_files = get_latest_vsdx_file()
+    # Get the latest .vsdx file; older uploads are left in place
+    latest_vsdx, _ = get_latest_vsdx_file()
 
     if not latest_vsdx:
         print("No VSDX file available for processing.")
         return
 
-    # Delete all old .vsdx files (except the latest one)
-    clean_old_vsdx_files(older_files)
-
     # Save the selected file path
     save_vsdx_path(latest_vsdx)
 
-    # Directory to extract the contents
-    extract_dir = os.path.expanduser("~/INDA/VisioGns3/vsdx/extracted_vsdx")
-
-    # Ensure the extraction directory exists
-    os.makedirs(extract_dir, exist_ok=True)
-
-    # Open and extract the latest .vsdx file
-    with zipfile.ZipFile(latest_vsdx, 'r') as zip_ref:
-        zip_ref.extractall(extract_dir)
+    # Parse the archive in place; pipeline.py turns the result into a topology
+    shapes, masters, connects, portals = stream_vsdx(latest_vsdx)
 
-    print(f'XML files extracted to: {extract_dir}')
+    print(f"Read {latest_vsdx}: {len(shapes)} shapes, {len(connects)} connects, "
+          f"{len(masters)} masters, {len(portals)} off-page references")
 
 if __name__ == "__main__":
     main()
@@ -33,18 +33,45 @@ def parse_masters_xml(masters_xml):
     tree = ET.parse(masters_xml)
     root = tree.getroot()
 
+    raw_masters = {master.get("ID"): master.get("Name") for master in root.findall(".//visio:Master", NAMESPACES)}
+    return machine_masters(raw_masters)
+
+def machine_masters(raw_masters):
+    """
+    Filter raw master names down to machine names.
+    
+    :param raw_masters: Dictionary mapping master IDs to master names as found in masters.xml.
+    :return: Dictionary mapping master IDs to machine names.
+    """
     masters = {}
-    for master in root.findall(".//visio:Master", NAMESPACES):
-        master_id = master.get("ID")
-        master_name = master.get("Name")
+    for master_id, master_name in raw_masters.items():
         if master_id and master_name:
             # Filter out unwanted names
-            if "Rack Frame" in master_name or "Dynamic connector" in master_name:
+            if "Rack Frame" in master_name or "Dynamic connector" in master_name or "Off-page reference" in master_name:
                 continue  
             masters[master_id] = master_name.replace(" ", "")  # Remove spaces
 
     return masters
 
+def collect_machine_names(shapes, masters):
+    """
+    Map parsed shapes to machine names.
+    
+    :param shapes: Dictionary mapping shape IDs to master IDs.
+    :param masters: Dictionary mapping master IDs to machine names.
+    :return: Sorted list of unique machine names.
+    """
+    machine_names = set()  # Use set to avoid duplicates
+
+    # Process each shape and map it to a machine name
+    for shape_id, master_id in shapes.items():
+        machine_name = masters.get(master_id)
+        if machine_name:  # Skip if filtered out
+            full_name = f"{machine_name}{shape_id}"
+            machine_names.add(full_name)
+
+    return sorted(machine_names)
+
 def extract_machine_names(pages_xml, masters_xml, output_txt):
     """
     Extract machine names using pages.xml and masters.xml, then save them to a file.
@@ -57,18 +84,11 @@ def extract_machine_names(pages_xml, masters_xml, output_txt):
     shapes = parse_pages_xml(pages_xml)
     masters = parse_masters_xml(masters_xml)
 
-    machine_names = set()  # Use set to avoid duplicates
-
-    # Process each shape and map it to a machine name
-    for shape_id, master_id in shapes.items():
-        machine_name = masters.get(master_id)
-        if machine_name:  # Skip if filtered out
-            full_name = f"{machine_name}{shape_id}"
-            machine_names.add(full_name)
+    machine_names = collect_machine_names(shapes, masters)
 
     # Save machine names to file
     with open(output_txt, 'w') as f:
-        for name in sorted(machine_names):
+        for name in machine_names:
             f.write(name + '\n')
 
     print(f"Machine names have been saved to {output_txt}")
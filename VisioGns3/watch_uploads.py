@@ -0,0 +1,308 @@
+"""
+watch_uploads.py
+
+Watches uploads/ and sends every new or changed diagram through pipeline.py.
+
+On Linux the directory is watched with inotify (through ctypes, no extra
+packages); elsewhere the watcher falls back to comparing directory listings.
+A file is only picked up once it has had no events for SETTLE_SECONDS and its
+size and mtime have stopped changing, so half-written uploads are never
+parsed. The state of every file (queued, processing, done or failed, and the
+content digest it was last deployed from) is kept in SQLite: an unchanged
+file is not deployed twice, and files dropped while the watcher was down
+are handled at startup. Every deploy is a reconcile, so a changed file only
+updates what changed in its project. Uploads are never deleted.
+
+Run with:  python3 watch_uploads.py [--uploads-dir DIR] [--no-deploy]
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import sqlite3
+import struct
+import threading
+import time
+
+import pipeline
+import parse_cache
+import gns3_deployer
+
+STATE_PATH = os.path.join(pipeline.BASE_DIR, "cache", "watch_state.sqlite")
+SETTLE_SECONDS = 2.0   # quiet time before a file counts as completely written
+POLL_INTERVAL = 1.0    # seconds between checks for settled files
+PARTIAL_SUFFIXES = (".part", ".tmp", ".crdownload", "~")
+
+# inotify(7) event flags
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000  # the kernel queue filled up and events were dropped
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+
+def log(message):
+    print(f"[{time.strftime('%H:%M:%S')}] {message}", flush=True)
+
+
+def is_diagram(name):
+    """True for .vsdx/.xml/.svg files that are not hidden or temporary copies."""
+    if name.startswith(".") or name.endswith(PARTIAL_SUFFIXES):
+        return False
+    return name.rsplit(".", 1)[-1].lower() in pipeline.FORMATS
+
+
+def file_signature(path):
+    """Return (size, mtime) of a file, or None if it is gone."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class InotifyWatcher:
+    """Reports the names of files created, written or moved into a directory, using inotify."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"Cannot watch {directory}")
+
+    def read(self, timeout):
+        """Wait up to timeout seconds and return the set of file names that had events."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        names = set()
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            if mask & IN_Q_OVERFLOW:
+                # Which files changed is lost; report them all, unchanged ones are skipped by digest
+                names.update(os.listdir(self.directory))
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback for platforms without inotify: compares directory listings."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._seen = self._snapshot()
+
+    def _snapshot(self):
+        snapshot = {}
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                stat = entry.stat()
+                snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def read(self, timeout):
+        time.sleep(timeout)
+        snapshot = self._snapshot()
+        changed = {name for name, signature in snapshot.items() if self._seen.get(name) != signature}
+        self._seen = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(directory):
+    try:
+        return InotifyWatcher(directory)
+    except (OSError, AttributeError):  # no libc inotify symbols outside Linux
+        log("inotify unavailable, polling the uploads directory instead")
+        return PollingWatcher(directory)
+
+
+class Debouncer:
+    """Holds back files until they had no events for settle seconds and their size and mtime held still."""
+
+    def __init__(self, settle=SETTLE_SECONDS):
+        self.settle = settle
+        self._pending = {}  # path -> (time of last event, signature then)
+
+    def touch(self, path):
+        self._pending[path] = (time.monotonic(), file_signature(path))
+
+    def ready(self):
+        """Return the files that have settled since the last call."""
+        now = time.monotonic()
+        settled = []
+        for path, (last_event, signature) in list(self._pending.items()):
+            if now - last_event < self.settle:
+                continue
+            current = file_signature(path)
+            if current is None:
+                del self._pending[path]  # deleted or renamed away before it settled
+            elif current != signature:
+                self._pending[path] = (now, current)
+            else:
+                del self._pending[path]
+                settled.append(path)
+        return settled
+
+
+class UploadState:
+    """SQLite record of every upload the watcher has seen and what became of it."""
+
+    def __init__(self, path=STATE_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS uploads ("
+            " path TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " deployed_digest TEXT,"
+            " error TEXT,"
+            " updated REAL NOT NULL)"
+        )
+        self._db.commit()
+
+    def deployed_digest(self, path):
+        """Digest of the content last processed successfully, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT deployed_digest FROM uploads WHERE path = ?", (path,)).fetchone()
+        return row[0] if row else None
+
+    def set_status(self, path, status, error=None, deployed_digest=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO uploads (path, status, deployed_digest, error, updated) VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT(path) DO UPDATE SET status = excluded.status, error = excluded.error,"
+                " updated = excluded.updated,"
+                " deployed_digest = COALESCE(excluded.deployed_digest, uploads.deployed_digest)",
+                (path, status, deployed_digest, error, time.time()),
+            )
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+class UploadProcessor:
+    """Runs settled uploads through the pipeline one at a time on a background thread."""
+
+    def __init__(self, state, deploy=True, max_in_flight=gns3_deployer.MAX_IN_FLIGHT):
+        self.state = state
+        self.deploy = deploy
+        self.max_in_flight = max_in_flight
+        self._queue = queue.Queue()
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="upload-processor", daemon=True)
+        self._thread.start()
+
+    def submit(self, path):
+        """Queue a settled file unless it is already waiting."""
+        with self._lock:
+            if path in self._queued:
+                return
+            self._queued.add(path)
+        self.state.set_status(path, "queued")
+        self._queue.put(path)
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            with self._lock:
+                self._queued.discard(path)
+            self._process(path)
+
+    def _process(self, path):
+        name = os.path.basename(path)
+        try:
+            digest = parse_cache.file_digest(path)
+        except FileNotFoundError:
+            self.state.set_status(path, "failed", error="File removed before processing")
+            return
+
+        deployed = self.state.deployed_digest(path)
+        if digest == deployed:
+            self.state.set_status(path, "done")
+            log(f"⏭️  {name} unchanged since its last deployment")
+            return
+
+        # Reconcile also creates the project when it is missing, and it picks up
+        # a project left behind by an earlier deploy that failed halfway
+        log(f"➡️ Processing {name}")
+        self.state.set_status(path, "processing")
+        try:
+            pipeline.run_pipeline(path, deploy=self.deploy, reconcile=self.deploy, max_in_flight=self.max_in_flight)
+        except Exception as e:
+            self.state.set_status(path, "failed", error=str(e))
+            log(f"❌ {name}: {e}")
+            return
+        # A parse-only run has not deployed anything, so the next deploying run must still pick it up
+        self.state.set_status(path, "done", deployed_digest=digest if self.deploy else None)
+        log(f"✅ {name} done")
+
+
+def watch(uploads_dir=pipeline.UPLOADS_DIR, state_path=STATE_PATH, settle=SETTLE_SECONDS, deploy=True,
+          max_in_flight=gns3_deployer.MAX_IN_FLIGHT):
+    """Watch uploads_dir until interrupted, processing every diagram that settles in it."""
+    os.makedirs(uploads_dir, exist_ok=True)
+    state = UploadState(state_path)
+    processor = UploadProcessor(state, deploy, max_in_flight)
+    debouncer = Debouncer(settle)
+    watcher = make_watcher(uploads_dir)
+
+    # Files that arrived while the watcher was not running; unchanged ones are skipped by digest
+    for name in sorted(os.listdir(uploads_dir)):
+        if is_diagram(name):
+            debouncer.touch(os.path.join(uploads_dir, name))
+
+    log(f"👀 Watching {uploads_dir}")
+    try:
+        while True:
+            for name in watcher.read(POLL_INTERVAL):
+                if is_diagram(name):
+                    debouncer.touch(os.path.join(uploads_dir, name))
+            for path in debouncer.ready():
+                processor.submit(path)
+    except KeyboardInterrupt:
+        log("Stopping")
+    finally:
+        watcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deploy diagrams dropped into the uploads directory.")
+    parser.add_argument("--uploads-dir", default=pipeline.UPLOADS_DIR)
+    parser.add_argument("--state-path", default=STATE_PATH, help="SQLite file tracking each upload's state")
+    parser.add_argument("--settle", type=float, default=SETTLE_SECONDS,
+                        help="Seconds a file must stay unchanged before it is processed")
+    parser.add_argument("--no-deploy", action="store_true", help="Parse only, do not create projects on the server")
+    parser.add_argument("--max-in-flight", type=int, default=gns3_deployer.MAX_IN_FLIGHT,
+                        help="Maximum concurrent requests to the GNS3 server")
+    args = parser.parse_args()
+
+    watch(args.uploads_dir, args.state_path, args.settle, deploy=not args.no_deploy, max_in_flight=args.max_in_flight)
+
+
+if __name__ == "__main__":
+    main()
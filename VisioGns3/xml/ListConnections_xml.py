@@ -18,8 +18,11 @@ def get_latest_upload(uploads_dir):
 def parse_drawio_xml(xml_file):
     """Parse draw.io XML to extract devices and connections with unique names."""
     tree = ET.parse(xml_file)
-    root = tree.getroot()
+    return parse_drawio_root(tree.getroot())
 
+
+def parse_drawio_root(root):
+    """Extract devices and connections from an already parsed draw.io XML root."""
     devices = {}
     name_counter = defaultdict(int)
     connections = []
@@ -43,8 +43,10 @@ def save_xml_path(xml_file):
 # Extract machine names from XML
 def extract_machine_names(xml_file):
     tree = ET.parse(xml_file)
-    root = tree.getroot()
+    return machine_names_from_root(tree.getroot())
 
+# Extract machine names from an already parsed draw.io XML root
+def machine_names_from_root(root):
     machine_names = []
     name_counter = defaultdict(int)
 
@@ -11,6 +11,9 @@ GNS3_SERVER_DETAILS = os.path.join(GENERATED_DIR, "gns3_server_details.txt")
 CONNECTIONS_FILE = os.path.join(GENERATED_DIR, "Connections.json")
 OUTPUT_PLAYBOOK = os.path.join(BASE_DIR, "Main_playbooks", "Gns3_Connections.yaml")
 
+# Links created per playbook task
+LINK_BATCH_SIZE = 100
+
 
 def read_gns3_server_details(file_path):
     """Reads the GNS3 server details (IP and port) from the text file."""
@@ -37,11 +40,29 @@ def get_project_name_from_xml(xml_path):
     return os.path.splitext(os.path.basename(xml_path))[0]
 
 
+# Check if device is Ethernet switch/hub
+def is_switch_or_hub(name):
+    return any(keyword in name.lower() for keyword in ["atm_switch","hub","atm_fast_gigabit_etherswitch"])
+
+
+def endpoint_ports(device, adapter_number):
+    """Returns the (adapter_number, port_number) pair used to attach a link to the device."""
+    if is_switch_or_hub(device):
+        return 0, adapter_number  # use adapter number as port number
+    return adapter_number, 0
+
+
 def generate_ansible_playbook(ip, port, connections_file, project_name):
     # Load the JSON data
     with open(connections_file, 'r') as file:
         connections = json.load(file)
 
+    return build_connections_playbook(ip, port, connections, project_name)
+
+
+def build_connections_playbook(ip, port, connections, project_name):
+    """Builds the Ansible playbook content that creates the links between nodes."""
+
     # Start creating the playbook content
     playbook = f"""---
 - name: Create links in GNS3 project based on JSON file
@@ -85,38 +106,38 @@ def generate_ansible_playbook(ip, port, connections_file, project_name):
         method: GET
         return_content: yes
       register: gns3_nodes
-    """
-
-    # Add the tasks for creating the links
-        # Add the tasks for creating the links
-    for idx, connection in enumerate(connections, start=1):
-        from_device = connection['from']
-        to_device = connection['to']
-        from_adapter_number = connection['from_adapter_number']
-        to_adapter_number = connection['to_adapter_number']
-
-        # Check if device is Ethernet switch/hub
-        def is_switch_or_hub(name):
-            return any(keyword in name.lower() for keyword in ["atm_switch","hub","atm_fast_gigabit_etherswitch"])
-
-        if is_switch_or_hub(from_device):
-            from_adapter = 0
-            from_port = from_adapter_number  # use adapter number as port number
-        else:
-            from_adapter = from_adapter_number
-            from_port = 0
-
-        if is_switch_or_hub(to_device):
-            to_adapter = 0
-            to_port = to_adapter_number
-        else:
-            to_adapter = to_adapter_number
-            to_port = 0
 
-        playbook += f"""
-    - name: Create link {from_device} to {to_device}
-      vars:
+    - name: Index device node IDs by name
+      set_fact:
         device_map: "{{{{ gns3_nodes.json | items2dict(key_name='name', value_name='node_id') }}}}"
+
+    - name: Check that every link endpoint exists in the project
+      assert:
+        that: missing_devices | length == 0
+        fail_msg: "No node in the project for: {{{{ missing_devices | join(', ') }}}}"
+        quiet: yes
+      vars:
+        link_devices: {json.dumps(sorted({device for connection in connections for device in (connection['from'], connection['to'])}))}
+        missing_devices: "{{{{ link_devices | reject('in', device_map) | list }}}}"
+"""
+
+    # Add the tasks for creating the links, LINK_BATCH_SIZE links per task
+    for start in range(0, len(connections), LINK_BATCH_SIZE):
+        batch = connections[start:start + LINK_BATCH_SIZE]
+        items = []
+        for connection in batch:
+            from_device = connection['from']
+            to_device = connection['to']
+            from_adapter, from_port = endpoint_ports(from_device, connection['from_adapter_number'])
+            to_adapter, to_port = endpoint_ports(to_device, connection['to_adapter_number'])
+            items.append(
+                f"        - {{from: {json.dumps(from_device)}, from_adapter: {from_adapter}, from_port: {from_port}, "
+                f"to: {json.dumps(to_device)}, to_adapter: {to_adapter}, to_port: {to_port}}}"
+            )
+        item_lines = "\n".join(items)
+
+        playbook += f"""
+    - name: Create links {start + 1} to {start + len(batch)}
       uri:
         url: "{{{{ gns3_server }}}}/v2/projects/{{{{ project_id }}}}/links"
         method: POST
@@ -124,16 +145,14 @@ def generate_ansible_playbook(ip, port, connections_file, project_name):
         headers:
           Content-Type: application/json
         status_code: [200, 201]
-        body:
-          nodes:
-          - node_id: "{{{{ device_map['{from_device}'] | default('') }}}}"
-            adapter_number: {from_adapter}
-            port_number: {from_port}
-          - node_id: "{{{{ device_map['{to_device}'] | default('') }}}}"
-            adapter_number: {to_adapter}
-            port_number: {to_port}
-        """
-
+        body: "{{{{ {{'nodes': [
+          {{'node_id': device_map[item.from], 'adapter_number': item.from_adapter, 'port_number': item.from_port}},
+          {{'node_id': device_map[item.to], 'adapter_number': item.to_adapter, 'port_number': item.to_port}}]}} }}}}"
+      loop:
+{item_lines}
+      loop_control:
+        label: "{{{{ item.from }}}} -> {{{{ item.to }}}}"
+"""
 
     return playbook
 
@@ -1,43 +1,343 @@
 import sys
 import os
+import html
 import subprocess
+import threading
+import time
+import shutil
+import signal
+from collections import OrderedDict, deque
 from PyQt6.QtWidgets import (QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
-                              QPushButton, QLabel, QLineEdit, QTextEdit, 
-                              QFileDialog, QMessageBox, QFrame, QStackedWidget, QScrollArea)
-from PyQt6.QtGui import QPalette, QColor, QFont
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+                              QPushButton, QLabel, QLineEdit, QPlainTextEdit, 
+                              QFileDialog, QMessageBox, QFrame, QStackedWidget,
+                              QListView, QStyledItemDelegate, QAbstractItemView, QListWidget,
+                              QListWidgetItem, QSpinBox)
+from PyQt6.QtGui import QPalette, QColor, QFont, QDesktopServices, QTextDocument
+from PyQt6.QtCore import (Qt, QObject, QThread, QTimer, QUrl, QSize, QModelIndex, QAbstractListModel, QEvent,
+                          pyqtSignal)
+
+# NLP modules (instruction parser, model and RAG clients)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "VisioGns3", "NLP1"))
+from instruction_orchestrator import InstructionOrchestrator
 
 # GNS3 Config File Path
 GNS3_CONF_PATH = os.path.expanduser("~/.config/GNS3/2.2/gns3_server.conf")
 
+# Automation jobs: each run gets its own directory under JOBS_DIR holding a copy
+# of the diagram, the generated files and the full log; the console only keeps the tail
+JOBS_DIR = os.path.expanduser("~/INDA/VisioGns3/jobs")
+MAX_PARALLEL_JOBS = 2
+LOG_FLUSH_INTERVAL_MS = 50
+LOG_LINES_PER_FLUSH = 400  # keeps each flush to a few milliseconds of layout work
+LOG_MAX_LINES = 5000
+STAGE_PREFIXES = ("➡️", "▶️")  # pipeline.py starts each stage's line with one of these
+
 class WorkerThread(QThread):
-    output_signal = pyqtSignal(str)
+    """
+    Runs the automation script. Output lines are written to log_path and
+    buffered; the GUI collects them with take_lines() on a timer instead of
+    receiving one signal per line.
+    """
     finished_signal = pyqtSignal()  # NEW: Signal when automation completes
 
-    def __init__(self, script_path):
+    def __init__(self, script_path, log_path, args=()):
         super().__init__()
         self.script_path = script_path
+        self.log_path = log_path
+        self.args = list(args)
+        self.process = None
+        self.returncode = None
+        self.cancelled = False
+        self.stage = None  # last stage line printed by the pipeline
+        self._lines = []
+        self._lock = threading.Lock()
+
+    def take_lines(self, limit=None):
+        """
+        Return and remove up to limit of the oldest buffered lines. Lines that
+        would scroll out of the console anyway (beyond LOG_MAX_LINES) are
+        dropped; they are still in the log file.
+        """
+        with self._lock:
+            if len(self._lines) > LOG_MAX_LINES:
+                del self._lines[:-LOG_MAX_LINES]
+            if limit is None or len(self._lines) <= limit:
+                lines, self._lines = self._lines, []
+            else:
+                lines, self._lines = self._lines[:limit], self._lines[limit:]
+        return lines
+
+    def cancel(self):
+        """Stop the script and everything it started; it runs in its own process group"""
+        with self._lock:
+            self.cancelled = True
+            process = self.process
+        if process is not None and process.poll() is None:
+            os.killpg(process.pid, signal.SIGTERM)
 
     def run(self):
-        process = subprocess.Popen(['bash', self.script_path], 
-                                   cwd=os.path.expanduser("~/INDA/VisioGns3"),
-                                   stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        with self._lock:
+            if self.cancelled:
+                self.finished_signal.emit()
+                return
+            self.process = subprocess.Popen(['bash', self.script_path, *self.args],
+                                            cwd=os.path.expanduser("~/INDA/VisioGns3"),
+                                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                            start_new_session=True)
+        process = self.process
 
-        for line in iter(process.stdout.readline, ''):
-            self.output_signal.emit(line.strip())
+        with open(self.log_path, "w", encoding="utf-8") as log_file:
+            for line in iter(process.stdout.readline, ''):
+                log_file.write(line)
+                line = line.rstrip()
+                if line.startswith(STAGE_PREFIXES):
+                    self.stage = line
+                with self._lock:
+                    self._lines.append(line)
 
         process.stdout.close()
-        process.wait()
+        self.returncode = process.wait()
         # NEW: Emit finished signal when automation completes
         self.finished_signal.emit()
 
 
+class AutomationJob:
+    """One queued diagram and the worker running it"""
+
+    def __init__(self, job_id, upload_path, work_dir):
+        self.id = job_id
+        self.upload_path = upload_path  # the job's own copy, inside work_dir
+        self.work_dir = work_dir
+        self.log_path = os.path.join(work_dir, "automation.log")
+        self.status = "queued"  # queued, running, done, failed or cancelled
+        self.worker = None
+
+    @property
+    def name(self):
+        return os.path.basename(self.upload_path)
+
+    def describe(self):
+        text = f"#{self.id}  {self.name}  —  {self.status}"
+        if self.status == "running" and self.worker.stage:
+            text += f": {self.worker.stage}"
+        return text
+
+
+class JobManager(QObject):
+    """
+    Queue of automation runs. Each job copies its diagram into its own
+    directory under JOBS_DIR and the pipeline writes its outputs there, so
+    jobs running side by side never pick up each other's uploads or
+    playbooks. At most max_parallel jobs run at once; the rest wait in order.
+    """
+    job_changed = pyqtSignal(object)
+    all_finished = pyqtSignal()
+
+    def __init__(self, script_path, max_parallel=MAX_PARALLEL_JOBS, parent=None):
+        super().__init__(parent)
+        self.script_path = script_path
+        self.max_parallel = max_parallel
+        self.jobs = {}
+        self._queue = deque()
+        self._next_id = 1
+
+    def submit(self, file_path):
+        """Queue a diagram; returns its job"""
+        job_id = self._next_id
+        self._next_id += 1
+        work_dir = os.path.join(JOBS_DIR, time.strftime("%Y%m%d-%H%M%S") + f"-{job_id}")
+        os.makedirs(work_dir, exist_ok=True)
+        upload_path = shutil.copy2(file_path, work_dir)
+
+        job = AutomationJob(job_id, upload_path, work_dir)
+        self.jobs[job_id] = job
+        self._queue.append(job)
+        self.job_changed.emit(job)
+        self._start_next()
+        return job
+
+    def cancel(self, job_id):
+        job = self.jobs[job_id]
+        if job.status == "queued":
+            self._queue.remove(job)
+            job.status = "cancelled"
+            self.job_changed.emit(job)
+            if not self._queue and not self.running_jobs():
+                self.all_finished.emit()
+        elif job.status == "running":
+            job.worker.cancel()  # _on_worker_finished records the cancellation
+
+    def set_max_parallel(self, count):
+        self.max_parallel = count
+        self._start_next()
+
+    def running_jobs(self):
+        return [job for job in self.jobs.values() if job.status == "running"]
+
+    def _start_next(self):
+        while self._queue and len(self.running_jobs()) < self.max_parallel:
+            job = self._queue.popleft()
+            job.worker = WorkerThread(self.script_path, job.log_path,
+                                      args=[job.upload_path, "--output-dir", job.work_dir])
+            job.worker.finished_signal.connect(self._on_worker_finished)
+            job.status = "running"
+            job.worker.start()
+            self.job_changed.emit(job)
+
+    def _on_worker_finished(self):
+        # Bound to this QObject so the signal is queued onto the GUI thread
+        job = next(job for job in self.jobs.values() if job.worker is self.sender())
+        if job.worker.cancelled:
+            job.status = "cancelled"
+        else:
+            job.status = "done" if job.worker.returncode == 0 else "failed"
+        self.job_changed.emit(job)
+        self._start_next()
+        if not self._queue and not self.running_jobs():
+            self.all_finished.emit()
+
+
+class InstructionThread(QThread):
+    """Answers an instruction off the GUI thread: rule-based parser first, RAG + LLM fallback otherwise."""
+    token_signal = pyqtSignal(str)
+    result_signal = pyqtSignal(dict)
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, orchestrator, instruction):
+        super().__init__()
+        self.orchestrator = orchestrator
+        self.instruction = instruction
+
+    def run(self):
+        try:
+            result = self.orchestrator.try_rules(self.instruction)
+            if result is None:
+                result = self.orchestrator.generate(self.instruction, on_token=self.token_signal.emit)
+        except Exception as e:
+            self.error_signal.emit(str(e))
+            return
+        self.result_signal.emit(result)
+
+
+# Chat transcript: message label and text colours per sender
+CHAT_SENDERS = {
+    "user": ("👤 You:", "#68D391", "#E2E8F0"),
+    "assistant": ("🤖 Assistant:", "#4299E1", "#A0AEC0"),
+}
+CHAT_MESSAGE_PADDING = 10
+CHAT_DOCUMENT_CACHE_SIZE = 200
+
+
+class ChatMessageModel(QAbstractListModel):
+    """Chat transcript, one row per message; text can grow while a reply streams in"""
+    SenderRole = Qt.ItemDataRole.UserRole + 1
+    RichRole = Qt.ItemDataRole.UserRole + 2
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._messages = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._messages)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        message = self._messages[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return message["text"]
+        if role == self.SenderRole:
+            return message["sender"]
+        if role == self.RichRole:
+            return message["rich"]
+        return None
+
+    def add_message(self, sender, text, rich=False):
+        """Append a message and return its row; rich text is shown as HTML"""
+        row = len(self._messages)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._messages.append({"sender": sender, "text": text, "rich": rich})
+        self.endInsertRows()
+        return row
+
+    def append_text(self, row, text):
+        """Extend a message, e.g. with a streamed token"""
+        self._messages[row]["text"] += text
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+    def set_text(self, row, text):
+        self._messages[row]["text"] = text
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+
+
+class ChatMessageDelegate(QStyledItemDelegate):
+    """
+    Paints one message as a small rich-text document. Only visible rows are
+    painted; laid-out documents are cached per (row, text, width) so
+    scrolling and streaming into the last message don't re-lay-out the rest.
+    The parent is the list view: messages are laid out to its viewport width,
+    and the cache is dropped whenever the viewport is resized.
+    """
+
+    def __init__(self, view):
+        super().__init__(view)
+        self._documents = OrderedDict()
+        view.viewport().installEventFilter(self)
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Resize:
+            self._documents.clear()
+        return super().eventFilter(watched, event)
+
+    def _width(self):
+        view = self.parent()
+        return view.viewport().width() - 2 * view.spacing()
+
+    def _document(self, index, width):
+        text = index.data(Qt.ItemDataRole.DisplayRole)
+        key = (index.row(), width)
+        cached = self._documents.get(key)
+        if cached is not None and cached[0] == text:
+            self._documents.move_to_end(key)
+            return cached[1]
+
+        label, label_color, text_color = CHAT_SENDERS[index.data(ChatMessageModel.SenderRole)]
+        body = text if index.data(ChatMessageModel.RichRole) else html.escape(text).replace("\n", "<br/>")
+        document = QTextDocument()
+        document.setDefaultFont(QFont("Segoe UI", 11))
+        document.setHtml(f"<span style='color: {label_color}; font-weight: bold;'>{label}</span><br/>"
+                         f"<span style='color: {text_color};'>{body}</span>")
+        document.setTextWidth(max(width - 2 * CHAT_MESSAGE_PADDING, 50))
+
+        self._documents[key] = (text, document)
+        if len(self._documents) > CHAT_DOCUMENT_CACHE_SIZE:
+            self._documents.popitem(last=False)
+        return document
+
+    def paint(self, painter, option, index):
+        document = self._document(index, self._width())
+        painter.save()
+        painter.translate(option.rect.left() + CHAT_MESSAGE_PADDING, option.rect.top() + CHAT_MESSAGE_PADDING)
+        document.drawContents(painter)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        width = self._width()
+        document = self._document(index, width)
+        return QSize(width, int(document.size().height()) + 2 * CHAT_MESSAGE_PADDING)
+
+
 class VisioGNS3App(QWidget):
     def __init__(self):
         super().__init__()
-        self.selected_file = None
-        self.chat_messages = []  # <CHANGE> Store chat messages for the chatbot interface
+        self.selected_files = []
         self.automation_completed = False  # NEW: Track if automation has completed
+        self.orchestrator = InstructionOrchestrator()
+        self.instruction_worker = None
+        self.last_topology = None  # machines/connections of the last answered instruction
+        self.streaming_row = None  # chat row the model's reply is streaming into
         self.initUI()
 
     def initUI(self):
@@ -239,11 +539,21 @@ class VisioGNS3App(QWidget):
             margin-bottom: 10px;
         """)
         
-        # Chat display area
-        self.chat_display = QTextEdit()
-        self.chat_display.setReadOnly(True)
+        # Chat display area: a list view over the message model, so adding or
+        # streaming a message only lays out that message
+        self.chat_model = ChatMessageModel(self)
+        self.chat_display = QListView()
+        self.chat_display.setModel(self.chat_model)
+        self.chat_delegate = ChatMessageDelegate(self.chat_display)
+        self.chat_display.setItemDelegate(self.chat_delegate)
+        # A message whose text grew (streaming) may need more height
+        self.chat_model.dataChanged.connect(lambda top, bottom, roles: self.chat_delegate.sizeHintChanged.emit(top))
+        self.chat_display.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
+        self.chat_display.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.chat_display.setResizeMode(QListView.ResizeMode.Adjust)
+        self.chat_display.setWordWrap(True)
         self.chat_display.setStyleSheet("""
-            QTextEdit {
+            QListView {
                 background-color: #1A202C;
                 color: #E2E8F0;
                 border: 1px solid #2D3748;
@@ -256,9 +566,7 @@ class VisioGNS3App(QWidget):
         self.chat_display.setMinimumHeight(400)
         
         # Add initial welcome message
-        self.chat_display.setHtml("""
-            <div style='color: #A0AEC0; margin-bottom: 15px;'>
-                <span style='color: #4299E1; font-weight: bold;'>🤖 Assistant:</span><br/>
+        self.chat_model.add_message("assistant", """
                 Hello! I'm here to help you set up your GNS3 server. You can ask me things like:<br/>
                 <ul style='margin-top: 10px; color: #718096;'>
                     <li>Configure my GNS3 server with IP 192.168.1.100</li>
@@ -266,8 +574,7 @@ class VisioGNS3App(QWidget):
                     <li>Show me the current configuration</li>
                     <li>Help me troubleshoot connection issues</li>
                 </ul>
-            </div>
-        """)
+        """, rich=True)
         
         # Input area container
         input_container = QFrame()
@@ -349,31 +656,61 @@ class VisioGNS3App(QWidget):
             return
         
         # Add user message to chat display
-        current_html = self.chat_display.toHtml()
-        user_message_html = f"""
-            <div style='margin-bottom: 15px;'>
-                <span style='color: #68D391; font-weight: bold;'>👤 You:</span><br/>
-                <span style='color: #E2E8F0;'>{message}</span>
-            </div>
-        """
-        
-        # Add bot response (placeholder for now)
-        bot_response_html = f"""
-            <div style='margin-bottom: 15px;'>
-                <span style='color: #4299E1; font-weight: bold;'>🤖 Assistant:</span><br/>
-                <span style='color: #A0AEC0;'>I received your instruction: "{message}". (NLP processing will be implemented here)</span>
-            </div>
-        """
-        
-        self.chat_display.setHtml(current_html + user_message_html + bot_response_html)
-        
-        # Scroll to bottom
-        scrollbar = self.chat_display.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+        self.add_chat_message("user", message)
         
         # Clear input field
         self.chat_input.clear()
 
+        if self.instruction_worker is not None and self.instruction_worker.isRunning():
+            self.append_assistant_message("Still working on the previous instruction, please wait.")
+            return
+
+        # The model's reply streams into this message, then becomes the summary;
+        # templated instructions are answered straight away by the rule-based parser
+        self.streaming_row = self.add_chat_message("assistant", "")
+        self.instruction_worker = InstructionThread(self.orchestrator, message)
+        self.instruction_worker.token_signal.connect(self.on_instruction_token)
+        self.instruction_worker.result_signal.connect(self.on_instruction_result)
+        self.instruction_worker.error_signal.connect(self.on_instruction_error)
+        self.instruction_worker.start()
+
+    def add_chat_message(self, sender, text):
+        """Append a message to the transcript and keep it in view; returns its row"""
+        row = self.chat_model.add_message(sender, text)
+        self.chat_display.scrollToBottom()
+        return row
+
+    def append_assistant_message(self, text):
+        self.add_chat_message("assistant", text)
+
+    def on_instruction_token(self, token):
+        """Stream a piece of the model's reply into its message"""
+        scrollbar = self.chat_display.verticalScrollBar()
+        follow = scrollbar.value() == scrollbar.maximum()
+        self.chat_model.append_text(self.streaming_row, token)
+        if follow:
+            self.chat_display.scrollToBottom()
+
+    def on_instruction_error(self, error):
+        self.chat_model.set_text(self.streaming_row, f"❌ {error}")
+        self.streaming_row = None
+
+    def on_instruction_result(self, result):
+        """Show the machines and connections built for an instruction"""
+        self.last_topology = {"machines": result["machines"], "connections": result["connections"]}
+        if result["source"] == "rules":
+            source = f"{result['topology'].replace('_', ' ')} topology, rule-based in {result['seconds'] * 1000:.2f} ms"
+        else:
+            source = f"language model in {result['seconds']:.1f} s"
+        lines = [f"✅ {len(result['machines'])} machines, {len(result['connections'])} connections ({source})",
+                 "Machines: " + ", ".join(result["machines"])]
+        lines += [f"{c['from']} ↔ {c['to']}" for c in result["connections"]]
+        if self.streaming_row is not None:
+            self.chat_model.set_text(self.streaming_row, "\n".join(lines))
+            self.streaming_row = None
+        else:
+            self.append_assistant_message("\n".join(lines))
+
     def create_console_page(self):
         """Create the automation console page"""
         page = QWidget()
@@ -548,15 +885,113 @@ class VisioGNS3App(QWidget):
         self.run_button.clicked.connect(self.run_script)
         self.run_button.setCursor(Qt.CursorShape.PointingHandCursor)
         
+        # Jobs Section: one row per queued/running/finished diagram
+        jobs_label = QLabel("🗂  Jobs")
+        jobs_label.setStyleSheet("color: white; font-size: 14px; font-weight: bold; margin-top: 10px;")
+
+        parallel_label = QLabel("Parallel jobs:")
+        parallel_label.setStyleSheet("color: #A0AEC0; font-size: 13px; margin-top: 10px;")
+        self.parallel_spin = QSpinBox()
+        self.parallel_spin.setRange(1, 8)
+        self.parallel_spin.setValue(MAX_PARALLEL_JOBS)
+        self.parallel_spin.setStyleSheet("""
+            QSpinBox {
+                background-color: #2D3748;
+                color: white;
+                border: 1px solid #4A5568;
+                border-radius: 4px;
+                padding: 4px;
+                margin-top: 10px;
+            }
+        """)
+
+        self.cancel_job_button = QPushButton("⛔ Cancel job")
+        self.cancel_job_button.setStyleSheet("""
+            QPushButton {
+                background-color: transparent;
+                color: #FC8181;
+                border: none;
+                font-size: 13px;
+                margin-top: 10px;
+            }
+            QPushButton:hover {
+                color: #FEB2B2;
+            }
+            QPushButton:disabled {
+                color: #4A5568;
+            }
+        """)
+        self.cancel_job_button.setEnabled(False)
+        self.cancel_job_button.clicked.connect(self.cancel_selected_job)
+        self.cancel_job_button.setCursor(Qt.CursorShape.PointingHandCursor)
+
+        jobs_header = QHBoxLayout()
+        jobs_header.addWidget(jobs_label)
+        jobs_header.addStretch()
+        jobs_header.addWidget(parallel_label)
+        jobs_header.addWidget(self.parallel_spin)
+        jobs_header.addWidget(self.cancel_job_button)
+
+        self.jobs_list = QListWidget()
+        self.jobs_list.setStyleSheet("""
+            QListWidget {
+                background-color: #1A202C;
+                color: #E2E8F0;
+                border: 1px solid #2D3748;
+                border-radius: 6px;
+                padding: 6px;
+                font-size: 13px;
+            }
+            QListWidget::item:selected {
+                background-color: #2D3748;
+            }
+        """)
+        self.jobs_list.setMaximumHeight(120)
+        self.jobs_list.currentItemChanged.connect(self.on_job_selected)
+        self.job_items = {}  # job id -> QListWidgetItem
+
+        self.job_manager = JobManager(os.path.expanduser("~/INDA/VisioGns3/automation_final.sh"),
+                                      self.parallel_spin.value(), self)
+        self.job_manager.job_changed.connect(self.on_job_changed)
+        self.job_manager.all_finished.connect(self.on_automation_finished)
+        self.parallel_spin.valueChanged.connect(self.job_manager.set_max_parallel)
+
         # Output Console Section
         console_label = QLabel(">_  Output Console")
         console_label.setStyleSheet("color: white; font-size: 14px; font-weight: bold; margin-top: 10px;")
+
+        self.open_log_button = QPushButton("📄 Open full log")
+        self.open_log_button.setStyleSheet("""
+            QPushButton {
+                background-color: transparent;
+                color: #63B3ED;
+                border: none;
+                font-size: 13px;
+                margin-top: 10px;
+            }
+            QPushButton:hover {
+                color: #90CDF4;
+            }
+            QPushButton:disabled {
+                color: #4A5568;
+            }
+        """)
+        self.open_log_button.setEnabled(False)
+        self.open_log_button.clicked.connect(self.open_full_log)
+        self.open_log_button.setCursor(Qt.CursorShape.PointingHandCursor)
+
+        console_header = QHBoxLayout()
+        console_header.addWidget(console_label)
+        console_header.addStretch()
+        console_header.addWidget(self.open_log_button)
         
-        self.output_text = QTextEdit()
+        # Plain text with a block limit: old lines are dropped, the full log stays on disk
+        self.output_text = QPlainTextEdit()
         self.output_text.setReadOnly(True)
+        self.output_text.setMaximumBlockCount(LOG_MAX_LINES)
         self.output_text.setPlaceholderText("Ready for commands...")
         self.output_text.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 background-color: #1A202C;
                 color: #E2E8F0;
                 border: 1px solid #2D3748;
@@ -567,6 +1002,10 @@ class VisioGNS3App(QWidget):
             }
         """)
         self.output_text.setMinimumHeight(200)
+
+        self.log_timer = QTimer(self)
+        self.log_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self.log_timer.timeout.connect(self.flush_output)
         
         # Add all widgets to content layout
         content_layout.addWidget(ip_label)
@@ -577,7 +1016,9 @@ class VisioGNS3App(QWidget):
         content_layout.addWidget(upload_label)
         content_layout.addWidget(upload_container)
         content_layout.addWidget(self.run_button)
-        content_layout.addWidget(console_label)
+        content_layout.addLayout(jobs_header)
+        content_layout.addWidget(self.jobs_list)
+        content_layout.addLayout(console_header)
         content_layout.addWidget(self.output_text)
         
         content.setLayout(content_layout)
@@ -613,87 +1054,147 @@ class VisioGNS3App(QWidget):
         port = self.input_port.text().strip()
 
         if not ip or not port:
-            self.output_text.append("⚠️  Please enter both IP and port.")
+            self.output_text.appendPlainText("⚠️  Please enter both IP and port.")
             return
 
         try:
             with open(GNS3_CONF_PATH, "w") as file:
                 file.write(f"[Server]\nhost = {ip}\nport = {port}\n")
 
-            self.output_text.append(f"✅ GNS3 Server configured with IP={ip}, Port={port}")
+            self.output_text.appendPlainText(f"✅ GNS3 Server configured with IP={ip}, Port={port}")
 
             subprocess.run(["pkill", "-f", "gns3server"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
             subprocess.Popen(["gns3server"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
-            self.output_text.append("🚀 GNS3 Server restarted with new settings.")
+            self.output_text.appendPlainText("🚀 GNS3 Server restarted with new settings.")
         
         except Exception as e:
-            self.output_text.append(f"❌ Error saving configuration: {e}")
+            self.output_text.appendPlainText(f"❌ Error saving configuration: {e}")
 
     def upload_file(self):
 
         # NEW: Clear logs if automation was previously completed
         if self.automation_completed:
             self.output_text.clear()
-            self.output_text.append("🧹 Logs cleared for new upload.")
+            self.output_text.appendPlainText("🧹 Logs cleared for new upload.")
             self.automation_completed = False
 
-        file_path, _ = QFileDialog.getOpenFileName(self, "Select a File", "", "All Files (*)")
-        if file_path:
+        file_paths, _ = QFileDialog.getOpenFileNames(self, "Select Files", "", "All Files (*)")
+        if file_paths:
             # --- File extension validation ---
             valid_extensions = (".vsdx", ".xml", ".svg")
-            if not file_path.lower().endswith(valid_extensions):
+            if not all(path.lower().endswith(valid_extensions) for path in file_paths):
                 QMessageBox.critical(self, "Invalid File", 
                                     "❌ Only .vsdx, .xml, or .svg files are allowed.\nPlease upload a valid file.")
                 self.file_label.setText("No file selected.")
                 self.file_label.setStyleSheet("color: #A0AEC0; font-size: 13px;")
-                self.output_text.append("❌ Invalid file type. Please upload a .vsdx, .xml, or .svg file.")
-                self.selected_file = None
+                self.output_text.appendPlainText("❌ Invalid file type. Please upload a .vsdx, .xml, or .svg file.")
+                self.selected_files = []
                 return
             # ----------------------------------
 
-            self.selected_file = file_path
-            filename = os.path.basename(file_path)
-            self.file_label.setText(filename)
+            self.selected_files = file_paths
+            filenames = [os.path.basename(path) for path in file_paths]
+            self.file_label.setText(filenames[0] if len(filenames) == 1 else f"{len(filenames)} files selected")
             self.file_label.setStyleSheet("color: #68D391; font-size: 13px;")
-            
-            upload_folder = os.path.expanduser("~/INDA/VisioGns3/uploads")
-            os.makedirs(upload_folder, exist_ok=True)
-            os.system(f"cp '{file_path}' '{upload_folder}'")
-            self.output_text.append(f"✅ File uploaded: {filename}")
+
+            # Each job copies its diagram into its own directory when it is queued. Nothing
+            # goes into uploads/, which watch_uploads.py would deploy a second time
+            for filename in filenames:
+                self.output_text.appendPlainText(f"✅ File selected: {filename}")
 
 
     def run_script(self):
-        script_path = os.path.expanduser("~/INDA/VisioGns3/automation_final.sh")
-        
-        self.output_text.clear()
-        self.output_text.append("🚀 Starting automation script...\n")
+        """Queue every selected diagram as its own job"""
+        if not self.selected_files:
+            self.output_text.appendPlainText("⚠️  Please select a .vsdx, .xml, or .svg file first.")
+            return
+
+        if not self.job_manager.running_jobs():
+            self.output_text.clear()
+        self.open_log_button.setEnabled(True)
         self.automation_completed = False  # NEW: Reset flag when starting new automation
 
-        self.worker = WorkerThread(script_path)
-        self.worker.output_signal.connect(self.update_output)
-        self.worker.finished_signal.connect(self.on_automation_finished)  # NEW: Connect finished signal
-        self.worker.start()
+        for file_path in self.selected_files:
+            job = self.job_manager.submit(file_path)
+            self.output_text.appendPlainText(f"🚀 Queued job #{job.id}: {job.name}")
+            self.output_text.appendPlainText(f"📄 Full log: {job.log_path}\n")
+
+        # Each job works on its own copy, so the selection can be queued again or replaced
+        self.selected_files = []
+        self.file_label.setText("No file selected.")
+        self.file_label.setStyleSheet("color: #A0AEC0; font-size: 13px;")
+        self.log_timer.start()
+
+    def cancel_selected_job(self):
+        item = self.jobs_list.currentItem()
+        if item is not None:
+            self.job_manager.cancel(item.data(Qt.ItemDataRole.UserRole))
+
+    def on_job_selected(self, item, previous=None):
+        job = self.job_manager.jobs[item.data(Qt.ItemDataRole.UserRole)] if item else None
+        self.cancel_job_button.setEnabled(job is not None and job.status in ("queued", "running"))
+
+    def on_job_changed(self, job):
+        """Add or refresh the job's row and report status changes in the console"""
+        item = self.job_items.get(job.id)
+        if item is None:
+            item = QListWidgetItem()
+            item.setData(Qt.ItemDataRole.UserRole, job.id)
+            self.jobs_list.addItem(item)
+            self.job_items[job.id] = item
+        item.setText(job.describe())
+        if item is self.jobs_list.currentItem():
+            self.on_job_selected(item)
+
+        if job.status in ("done", "failed", "cancelled"):
+            self.flush_job_output(job, limit=None)
+            message = {"done": "✅ completed successfully",
+                       "failed": f"❌ failed (exit code {job.worker.returncode})",
+                       "cancelled": "⛔ cancelled"}[job.status]
+            self.output_text.appendPlainText(f"[#{job.id}] {message}")
 
-    def update_output(self, text):
-        self.output_text.append(text)
-        self.output_text.ensureCursorVisible()
+    def flush_output(self, limit=LOG_LINES_PER_FLUSH):
+        """Append a batch of the lines each running job buffered, and refresh their progress"""
+        for job in self.job_manager.running_jobs():
+            self.flush_job_output(job, limit)
+            self.job_items[job.id].setText(job.describe())
+
+    def flush_job_output(self, job, limit=LOG_LINES_PER_FLUSH):
+        """Append a batch of the lines the job's worker buffered in one edit"""
+        if job.worker is None:
+            return
+        lines = job.worker.take_lines(limit)
+        if not lines:
+            return
+        scrollbar = self.output_text.verticalScrollBar()
+        follow = scrollbar.value() == scrollbar.maximum()  # don't yank the view if the user scrolled up
+        self.output_text.appendPlainText("\n".join(f"[#{job.id}] {line}" for line in lines))
+        if follow:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def open_full_log(self):
+        """Open the complete log of the selected job, or of the latest one, in the default viewer"""
+        item = self.jobs_list.currentItem()
+        if item is not None:
+            job = self.job_manager.jobs[item.data(Qt.ItemDataRole.UserRole)]
+        elif self.job_manager.jobs:
+            job = self.job_manager.jobs[max(self.job_manager.jobs)]
+        else:
+            return
+        if os.path.exists(job.log_path):
+            QDesktopServices.openUrl(QUrl.fromLocalFile(job.log_path))
         
     # NEW: Method to handle automation completion
     def on_automation_finished(self):
-        """Clear input fields when automation completes"""
-        self.output_text.append("\n✅ Automation completed successfully!")
+        """Clear input fields once the queue has drained"""
+        self.log_timer.stop()
         
         # Clear IP and Port fields
         self.input_ip.clear()
         self.input_port.clear()
         
-        # Clear file selection
-        self.selected_file = None
-        self.file_label.setText("No file selected.")
-        self.file_label.setStyleSheet("color: #A0AEC0; font-size: 13px;")
-        
-        self.output_text.append("🧹 Input fields cleared and ready for next task.")
+        self.output_text.appendPlainText("\n🧹 All jobs finished. Input fields cleared and ready for next task.")
         self.automation_completed = True  # NEW: Set flag to indicate automation completed
 
 # Run the application